@@ -0,0 +1,109 @@
+"""
+Benchmark `BaseSchema.cast` against the previous column by column algorithm, in ms per million rows.
+
+    python -m abc_core.benchmarks.cast --rows 1000000
+"""
+
+import logging
+import time
+from typing import Callable, Dict
+
+import click
+import numpy as np
+import pandas as pd
+import pandera as pa
+from pandera.typing import Series
+
+from abc_core.schema.base_schema import BaseSchema
+
+logger = logging.getLogger(__name__)
+
+
+class CastBenchmarkSchema(BaseSchema):
+    """Schema covering every cast branch."""
+
+    _label = "cast_benchmark_schema"
+
+    int_col: Series[int] = pa.Field(nullable=True)
+    float_col: Series[float] = pa.Field(nullable=True)
+    str_col: Series[str] = pa.Field(nullable=True)
+    bool_col: Series[bool] = pa.Field()
+    date_col: Series[np.datetime64] = pa.Field()
+
+
+def legacy_cast(schema: BaseSchema, data: pd.DataFrame) -> pd.DataFrame:
+    """Previous `BaseSchema.cast`, kept as benchmark reference."""
+    for col, col_type in schema.get_metadata().dtypes.items():
+        if col in data.columns:
+            if col_type == str:
+                data[col] = data[col].replace({np.nan: None}).astype(col_type).replace({"None": None})
+            elif col_type == int:
+                data[col] = np.floor(pd.to_numeric(data[col], errors="coerce")).astype(pd.Int64Dtype())
+            elif col_type == float:
+                data[col] = pd.to_numeric(data[col], errors="coerce").astype(pd.Float64Dtype())
+            elif (col_type == bool) and (data[col].dtypes == object):
+                data[col] = data[col].fillna("False").astype(str).str.lower() == "true"
+            else:
+                data[col] = data[col].astype(col_type)
+    return data
+
+
+def get_benchmark_frames(rows: int, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """Frames as read from file: raw float and object columns, and already cast columns."""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(100, 30, rows)
+    values[rng.random(rows) < 0.05] = np.nan
+    raw = pd.DataFrame(
+        {
+            "int_col": values,
+            "float_col": values,
+            "str_col": pd.Series(rng.integers(0, 1000, rows)).astype(str).where(~np.isnan(values), None),
+            "bool_col": rng.random(rows) < 0.5,
+            "date_col": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1000, rows), unit="D"),
+        }
+    )
+    return {
+        "raw": raw,
+        "object": raw.astype({"int_col": object, "float_col": object, "bool_col": object}),
+        "cast": CastBenchmarkSchema.cast(raw.copy()),
+    }
+
+
+def time_cast(cast_fcn: Callable, df: pd.DataFrame, repeat: int) -> float:
+    """Best run time in seconds of cast_fcn on fresh copies of df."""
+    run_times = []
+    for _ in range(repeat):
+        data = df.copy()
+        t1 = time.perf_counter()
+        cast_fcn(data)
+        run_times.append(time.perf_counter() - t1)
+    return min(run_times)
+
+
+@click.command()
+@click.option("--rows", default=1_000_000, help="Number of rows of the benchmark frames")
+@click.option("--repeat", default=3, help="Number of timed repetitions, the best is reported")
+@click.option("--max-workers", default=4, help="Threads of the parallel cast")
+def main(rows: int, repeat: int, max_workers: int):
+    """."""
+    cast_fcns = {
+        "legacy": lambda data: legacy_cast(CastBenchmarkSchema, data),
+        "fast": lambda data: CastBenchmarkSchema.cast(data),
+        f"fast_{max_workers}_threads": lambda data: CastBenchmarkSchema.cast(data, max_workers=max_workers),
+    }
+    results = []
+    for frame_name, df in get_benchmark_frames(rows=rows).items():
+        expected = legacy_cast(CastBenchmarkSchema, df.copy())
+        pd.testing.assert_frame_equal(CastBenchmarkSchema.cast(df.copy()), expected)
+        for cast_name, cast_fcn in cast_fcns.items():
+            run_time = time_cast(cast_fcn, df=df, repeat=repeat)
+            results.append({"frame": frame_name, "cast": cast_name, "ms_per_million_rows": 1e9 * run_time / rows})
+
+    results_df = pd.DataFrame(results).pivot(index="frame", columns="cast", values="ms_per_million_rows")
+    print(results_df[list(cast_fcns)].round(1).to_string())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # pylint: disable=no-value-for-parameter
+    main()
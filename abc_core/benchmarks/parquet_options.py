@@ -0,0 +1,123 @@
+"""
+Benchmark parquet writer settings on the pipeline tables: write time, read time and file size.
+
+    python -m abc_core.benchmarks.parquet_options --processed-data-version testing --run-version testing
+"""
+
+import logging
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple, Union
+
+import click
+import pandas as pd
+
+from abc_core.run import DEFAULT_CONFIG_FILES
+from abc_core.utils.parser import read_yaml_files
+from abc_core.utils.read_write import get_file_path, get_parquet_options, get_parquet_write_kwargs
+
+logger = logging.getLogger(__name__)
+
+# parquet_options compared on every table, next to the configured ones
+PARQUET_OPTIONS_GRID: List[Dict] = [
+    {"engine": "pyarrow", "compression": None},
+    {"engine": "pyarrow", "compression": "snappy"},
+    {"engine": "pyarrow", "compression": "lz4"},
+    {"engine": "pyarrow", "compression": "zstd", "compression_level": 1},
+    {"engine": "pyarrow", "compression": "zstd", "compression_level": 9},
+    {"engine": "pyarrow", "compression": "gzip"},
+    {"engine": "pyarrow", "compression": "snappy", "use_dictionary": False},
+    {"engine": "pyarrow", "compression": "zstd", "compression_level": 1, "row_group_size": 16384},
+    {"engine": "pyarrow", "compression": "zstd", "compression_level": 1, "write_statistics": False},
+    {"engine": "fastparquet", "compression": "snappy"},
+    {"engine": "fastparquet", "compression": "zstd", "compression_level": 1},
+]
+
+
+def get_benchmark_tables(config: Dict, processed_data_version: str, run_version: str, pipeline: str) -> Dict:
+    """Paths and configured parquet_options of the existing processed and output parquet tables."""
+    tables = {}
+    sections = [
+        (config.data.processed_data, processed_data_version, None),
+        (config.data.output_data, run_version, pipeline),
+    ]
+    for data_config, time_connector, pipeline_name in sections:
+        for table, file_name in data_config.tables.items():
+            path = get_file_path(
+                base_directory=data_config.base_directory,
+                time_connector=time_connector,
+                file_name=file_name,
+                pipeline_name=pipeline_name,
+            )
+            if file_name.endswith(".parquet") and os.path.exists(path):
+                tables[table] = (path, get_parquet_options(data_config, table))
+    return tables
+
+
+def time_call(fcn: Callable, repeat: int) -> float:
+    """Best run time in seconds of fcn over repeat calls."""
+    run_times = []
+    for _ in range(repeat):
+        t1 = time.perf_counter()
+        fcn()
+        run_times.append(time.perf_counter() - t1)
+    return min(run_times)
+
+
+def benchmark_parquet_options(df: pd.DataFrame, parquet_options: Dict, repeat: int = 3) -> Dict:
+    """Write and read df with parquet_options, returning timings in ms and file size in KB."""
+    write_kwargs = get_parquet_write_kwargs(parquet_options)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "table.parquet")
+        write_time = time_call(lambda: df.to_parquet(path, **write_kwargs), repeat=repeat)
+        read_time = time_call(lambda: pd.read_parquet(path, engine=write_kwargs["engine"]), repeat=repeat)
+        size = os.path.getsize(path)
+    return {"write_ms": 1000 * write_time, "read_ms": 1000 * read_time, "size_kb": size / 2**10}
+
+
+@click.command()
+@click.option("--config", default=(), multiple=True, help="Configuration files, default: configs/*.yml")
+@click.option("--processed-data-version", default="testing", help="Version of the processed data tables")
+@click.option("--run-version", default="testing", help="Version of the output tables")
+@click.option("--pipeline", "-p", default="forecast_model", help="Pipeline which wrote the output tables")
+@click.option("--repeat", default=3, help="Number of timed repetitions, the best is reported")
+@click.option("--output", default=None, help="Optional csv file to save the results to")
+def main(
+    config: Union[Tuple[str], List[str]],
+    processed_data_version: str,
+    run_version: str,
+    pipeline: str,
+    repeat: int,
+    output: str,
+):
+    """."""
+    config = read_yaml_files(list(config) or DEFAULT_CONFIG_FILES)
+    tables = get_benchmark_tables(
+        config=config,
+        processed_data_version=processed_data_version,
+        run_version=run_version,
+        pipeline=pipeline,
+    )
+    if not tables:
+        raise click.ClickException("No parquet tables found, run the pipelines first.")
+
+    results = []
+    for table, (path, configured_options) in tables.items():
+        df = pd.read_parquet(path)
+        logger.info(f"Benchmarking {table} {df.shape} from {path}")
+        for parquet_options in [configured_options] + PARQUET_OPTIONS_GRID:
+            result = benchmark_parquet_options(df=df, parquet_options=parquet_options, repeat=repeat)
+            results.append({"table": table, "rows": len(df), "options": str(parquet_options), **result})
+
+    results_df = pd.DataFrame(results)
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.max_colwidth", 100):
+        print(results_df.round(2).to_string(index=False))
+    if output:
+        results_df.to_csv(output, index=False)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # pylint: disable=no-value-for-parameter
+    main()
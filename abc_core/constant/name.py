@@ -13,3 +13,6 @@ F_X5_LATITUDE = "x5_latitude"
 F_X6_LONGITUDE = "x6_longitude"
 F_X7_HAVERSINE_DISTANCE = "x7_haversine_distance"
 F_Y_HOUSE_PRICE_OF_UNIT_AREA = "y_house_price_of_unit_area"
+
+# data layout
+F_YEAR_MONTH = "year_month"
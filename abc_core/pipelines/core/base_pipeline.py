@@ -1,12 +1,44 @@
 import logging
 from abc import ABC, abstractmethod
-from typing import Tuple, Dict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Set, Tuple, Type
+from abc_core.pipelines.core.task_cache import TaskCache
 from abc_core.tasks.base_task import Task
 from abc_core.utils.timing import timing
+from abc_core.utils.write_behind import flush_pending_writes
 
 
 logger = logging.getLogger(__name__)
 
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+@timing
+def run_task(task: Task):
+    """Run a task, module level so it can be shipped to a process pool."""
+    logger.info(f"[START] Task: `{task.name}`")
+    output = task.run()
+    logger.info(f"[END] Task: `{task.name}`")
+    return output
+
+
+def get_task_dependencies(tasks: List[Type[Task]]) -> Dict[int, Set[int]]:
+    """Build the dependency graph of tasks from their declared inputs and outputs.
+
+    A task depends on every earlier task producing one of its inputs. Tasks which do not
+    declare their inputs depend on all earlier tasks, i.e. run sequentially.
+    """
+    dependencies = {}
+    for i, task in enumerate(tasks):
+        if task.inputs is None:
+            dependencies[i] = set(range(i))
+        else:
+            dependencies[i] = {j for j in range(i) if set(tasks[j].outputs).intersection(task.inputs)}
+    return dependencies
+
 
 class Pipeline(ABC):
     name: str = None
@@ -17,25 +49,75 @@ class Pipeline(ABC):
         self.tasks = (task(self.config) for task in self._tasks)
         self._parameters = {}
 
-    @timing
-    def _run_task(self, task: Task):
-        logger.info(f"[START] Task: `{task.name}`")
-        output = task.run()
-        logger.info(f"[END] Task: `{task.name}`")
-        return output
+    def _get_task_parameters(self, task: Type[Task], base_parameters: Dict) -> Dict:
+        """Select the parameters passed on to a task: pipeline parameters and declared inputs."""
+        if task.inputs is None:
+            return dict(self._parameters)
+        parameters = dict(base_parameters)
+        parameters.update({k: v for k, v in self._parameters.items() if k in task.inputs})
+        return parameters
+
+    def _get_task_cache(self) -> Optional[TaskCache]:
+        """Task cache configured under `cache` in pipelines.yml, None when disabled."""
+        cache_config = self.config.get("cache", {})
+        return TaskCache(config=cache_config) if cache_config.get("enabled", False) else None
 
     @timing
     def run(self):
-        for task, is_active in self._tasks:
-            if not is_active:
-                continue
+        tasks = [task for task, is_active in self._tasks if is_active]
+        dependencies = get_task_dependencies(tasks)
+        base_parameters = dict(self._parameters)
+
+        scheduler_config = self.config.pipelines[self.name].get("scheduler", {})
+        executor_class = EXECUTORS[scheduler_config.get("executor", "thread")]
+        max_workers = scheduler_config.get("max_workers", 1)
+        cache = self._get_task_cache()
 
-            task = task(**self._parameters)
-            output = self._run_task(task)
+        outputs = {}
+        running = {}
+        submitted = set()
+        upstream_keys = {}  # cache key of the task producing each parameter
 
+        def complete(i: int, output: Dict, key: str = None):
+            outputs[i] = output
             if output:
                 self._parameters.update(**output)
-        return output
+            for name in tasks[i].outputs:
+                if key:
+                    upstream_keys[name] = key
+                else:
+                    upstream_keys.pop(name, None)
+
+        with executor_class(max_workers=max_workers) as executor:
+            while len(outputs) < len(tasks):
+                # submit every task whose upstream tasks have all completed
+                for i, task_class in enumerate(tasks):
+                    if i in submitted or not dependencies[i].issubset(outputs):
+                        continue
+                    submitted.add(i)
+                    task = task_class(**self._get_task_parameters(task=task_class, base_parameters=base_parameters))
+                    if cache and task.cacheable:
+                        flush_pending_writes()  # input artefacts are fingerprinted from disk
+                    key = cache.get_key(task=task, upstream_keys=upstream_keys) if cache and task.cacheable else None
+                    cached_output = cache.load(key=key, task=task) if key else None
+                    if cached_output is not None:
+                        logger.info(f"[CACHED] Task: `{task.name}` ({key[:12]})")
+                        complete(i, cached_output, key)
+                        continue
+                    running[executor.submit(run_task, task)] = (i, task, key)
+
+                if not running:
+                    continue
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    i, task, key = running.pop(future)
+                    output = future.result()
+                    if key:
+                        flush_pending_writes()  # output artefacts are copied into the cache
+                        cache.store(key=key, task=task, outputs=output)
+                    complete(i, output, key)
+
+        return outputs[len(tasks) - 1] if tasks else None
 
     @property
     def parameters(self):
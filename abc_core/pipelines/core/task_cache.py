@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+from typing import Dict, Optional
+
+import abc_core
+from abc_core.tasks.base_task import Task
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE_NAME = "index.json"
+OUTPUTS_FILE_NAME = "outputs.pickle"
+ARTEFACTS_DIRECTORY = "artefacts"
+CHUNK_SIZE = 2**20
+
+
+def hash_path(path: str) -> str:
+    """Hash the content of a file, or of every file below a directory."""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        file_paths = sorted(os.path.join(root, f) for root, _, files in os.walk(path) for f in files)
+    else:
+        file_paths = [path]
+    for file_path in file_paths:
+        digest.update(os.path.relpath(file_path, path).encode())
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_source_code(package_directory: str) -> str:
+    """Hash every python source file of a package."""
+    digest = hashlib.sha256()
+    for root, _, files in sorted(os.walk(package_directory)):
+        for f in sorted(files):
+            if f.endswith(".py"):
+                digest.update(hash_path(os.path.join(root, f)).encode())
+    return digest.hexdigest()
+
+
+def get_path_size(path: str) -> int:
+    """Size in bytes of a file or directory."""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+    return os.path.getsize(path)
+
+
+def copy_path(src: str, dst: str) -> None:
+    """Copy a file or directory, replacing any existing destination."""
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    if os.path.isdir(dst):
+        shutil.rmtree(dst)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+def get_config_value(config: Dict, key: str):
+    """Resolve a dotted config key, e.g. `forecast_model.ml_model`."""
+    value = config
+    for item in key.split("."):
+        value = value.get(item) if hasattr(value, "get") else None
+    return value.to_dict() if hasattr(value, "to_dict") else value
+
+
+class TaskCache:
+    """Content-addressed cache of task outputs.
+
+    Each task result is keyed on a hash of the package source code, the config subtrees
+    the task reads (`Task.config_keys`), the names and write options of its output artefacts
+    and its inputs: the cache key of the upstream task when produced in this run, otherwise
+    the content of the input artefact on disk.
+    Entries store the returned outputs and a copy of the written artefacts, and are
+    evicted least recently used first once `max_size_mb` or `max_entries` is exceeded.
+    """
+
+    def __init__(self, config: Dict):
+        self.base_directory = config.base_directory
+        self.max_size = config.get("max_size_mb", 2048) * 2**20
+        self.max_entries = config.get("max_entries", 100)
+        self.index_path = os.path.join(self.base_directory, INDEX_FILE_NAME)
+        self.index = self._load_index()
+        self.code_hash = hash_source_code(os.path.dirname(abc_core.__file__))
+
+    def _load_index(self) -> Dict:
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as fp:
+                return json.load(fp)
+        return {"entries": {}, "fingerprints": {}}
+
+    def _save_index(self) -> None:
+        os.makedirs(self.base_directory, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump(self.index, fp)
+        os.replace(tmp_path, self.index_path)
+
+    def _get_entry_directory(self, key: str) -> str:
+        return os.path.join(self.base_directory, self.index["entries"][key]["task"], key)
+
+    def fingerprint(self, path: str) -> str:
+        """Content hash of an artefact, memoized on its size and modification time."""
+        stat = os.stat(path)
+        stamp = [get_path_size(path), stat.st_mtime_ns]
+        memo = self.index["fingerprints"].get(path)
+        if memo is None or memo["stamp"] != stamp:
+            memo = {"stamp": stamp, "digest": hash_path(path)}
+            self.index["fingerprints"][path] = memo
+        return memo["digest"]
+
+    def get_key(self, task: Task, upstream_keys: Dict[str, str]) -> Optional[str]:
+        """Compute the cache key of a task, None if one of its inputs can't be resolved."""
+        inputs = {}
+        for name, path in task.input_artefacts().items():
+            if name in upstream_keys:
+                inputs[name] = upstream_keys[name]
+            elif os.path.exists(path):
+                inputs[name] = self.fingerprint(path)
+            else:
+                return None
+        data_sections = task.config.get("data") or {}
+        content = {
+            "task": task.name,
+            "code": self.code_hash,
+            "config": {key: get_config_value(task.config, key) for key in task.config_keys},
+            "inputs": inputs,
+            "outputs": [os.path.basename(path) for path in task.output_artefacts()],
+            "write_options": {
+                section: get_config_value(task.config, f"data.{section}.parquet_options") for section in data_sections
+            },
+        }
+        return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+    def load(self, key: str, task: Task) -> Optional[Dict]:
+        """Restore the artefacts of a cached task and return its outputs, None on cache miss."""
+        if key not in self.index["entries"]:
+            return None
+        entry_directory = self._get_entry_directory(key)
+        cached_paths = {
+            path: os.path.join(entry_directory, ARTEFACTS_DIRECTORY, os.path.basename(path))
+            for path in task.output_artefacts()
+        }
+        entry_paths = [*cached_paths.values(), os.path.join(entry_directory, OUTPUTS_FILE_NAME)]
+        missing = [path for path in entry_paths if not os.path.exists(path)]
+        if missing:
+            logger.warning(f"Dropping task cache entry {key[:12]} of `{task.name}`, missing {missing}.")
+            self._remove(key)
+            self._save_index()
+            return None
+        for path, cached_path in cached_paths.items():
+            copy_path(cached_path, path)
+        with open(os.path.join(entry_directory, OUTPUTS_FILE_NAME), "rb") as file:
+            outputs = pickle.load(file)
+        self.index["entries"][key]["last_access"] = time.time()
+        self._save_index()
+        return outputs
+
+    def store(self, key: str, task: Task, outputs: Dict) -> None:
+        """Save the outputs and artefacts of a task, then evict old entries."""
+        self.index["entries"][key] = {"task": task.name, "size": 0, "last_access": time.time()}
+        entry_directory = self._get_entry_directory(key)
+        try:
+            os.makedirs(entry_directory, exist_ok=True)
+            for path in task.output_artefacts():
+                copy_path(path, os.path.join(entry_directory, ARTEFACTS_DIRECTORY, os.path.basename(path)))
+            with open(os.path.join(entry_directory, OUTPUTS_FILE_NAME), "wb") as file:
+                pickle.dump(outputs, file)
+        except (OSError, pickle.PicklingError) as e:
+            logger.warning(f"Could not cache task `{task.name}`: {e}")
+            self._remove(key)
+            return
+        self.index["entries"][key]["size"] = get_path_size(entry_directory)
+        self._evict()
+        self._save_index()
+
+    def _remove(self, key: str) -> None:
+        shutil.rmtree(self._get_entry_directory(key), ignore_errors=True)
+        del self.index["entries"][key]
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits its size limits."""
+        entries = self.index["entries"]
+        by_last_access = sorted(entries, key=lambda k: entries[k]["last_access"])
+        total_size = sum(entry["size"] for entry in entries.values())
+        for key in by_last_access[:-1]:  # always keep the latest entry
+            if total_size <= self.max_size and len(entries) <= self.max_entries:
+                break
+            logger.info(f"Evicting task cache entry {key[:12]} of `{entries[key]['task']}`.")
+            total_size -= entries[key]["size"]
+            self._remove(key)
+
+        # drop fingerprints of artefacts which no longer exist
+        fingerprints = self.index["fingerprints"]
+        for path in [path for path in fingerprints if not os.path.exists(path)]:
+            del fingerprints[path]
@@ -10,6 +10,7 @@ from abc_core.utils.versioning import (
     get_versioning_in_config,
     save_config_as_yml,
 )
+from abc_core.utils.write_behind import enable_write_behind, flush_pending_writes
 
 
 # Set up the logger
@@ -47,6 +48,7 @@ DEFAULT_CONFIG_FILES = [
     help="Manually setting run version code, default: timestamp",
     required=False,
 )
+@click.option("--no-cache", is_flag=True, help="Recompute every task, ignoring the task cache")
 # @click.option("--verbose", "-v", is_flag=True, help="Enable verbose logging")
 def main(
     pipeline: str,
@@ -54,9 +56,15 @@ def main(
     run_version: str,
     raw_data_version: str,
     processed_data_version: str,
+    no_cache: bool,
 ):
     """."""
     config = read_yaml_files(list(config))
+    if no_cache and "cache" in config:
+        config.cache.enabled = False
+    write_behind_config = config.get("write_behind", {})
+    if write_behind_config.get("enabled", False):
+        enable_write_behind(max_workers=write_behind_config.get("max_workers", 4))
 
     # set up run info:
     run_info = {
@@ -75,10 +83,16 @@ def main(
             pipeline,
             config,
         )
+        flush_pending_writes()  # a failed background write fails the run
     except Exception as e:
         raise e
 
     finally:
+        try:
+            flush_pending_writes()  # writes still queued when the run failed
+        except Exception as e:
+            # logged rather than raised, so the config is saved and the original error propagates
+            logger.error(f"Background write failed: {e!r}")
         save_config_as_yml(config=config)
         logger.warning(str(config.run_details.to_dict()))
 
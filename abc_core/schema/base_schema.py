@@ -1,12 +1,33 @@
 """BaseSchema class."""
 
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from enum import Enum
-from typing import Dict, List
+from itertools import repeat
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from weakref import WeakKeyDictionary
 
 import numpy as np
 import pandas as pd
 import pandera as pa
 
+logger = logging.getLogger(__name__)
+
+
+class SchemaMetadata(NamedTuple):
+    """Compiled schema of a BaseSchema class and its column metadata."""
+
+    schema: pa.DataFrameSchema
+    columns: Dict[str, pa.Column]
+    column_names: List[str]
+    dtypes: Dict[str, Any]  # column name -> target type, as `field.dtype.type`
+    nullable: Dict[str, bool]
+    bounds: Dict[str, Tuple[Optional[float], Optional[float]]]  # declared (min, max) values
+
+
+# compiled schema per class object, a redefined class is compiled again, weak keys don't keep classes alive
+_SCHEMA_METADATA: "WeakKeyDictionary[type, SchemaMetadata]" = WeakKeyDictionary()
+
 
 class BaseSchema(pa.SchemaModel):
     """Abstract Schema class defining the mandatory attributes and methods."""
@@ -43,28 +64,49 @@ class BaseSchema(pa.SchemaModel):
         """Get enum values dict."""
         return cls.enum()
 
+    @classmethod
+    def get_metadata(cls) -> SchemaMetadata:
+        """Get compiled schema and column metadata, built once per class.
+
+        Returned containers are shared, copy them before modifying.
+        """
+        metadata = _SCHEMA_METADATA.get(cls)
+        if metadata is None:
+            schema = cls.to_schema()
+            columns = dict(schema.columns)
+            metadata = SchemaMetadata(
+                schema=schema,
+                columns=columns,
+                column_names=list(columns),
+                dtypes={name: field.dtype.type for name, field in columns.items()},
+                nullable={name: field.nullable for name, field in columns.items()},
+                bounds={name: get_declared_bounds(field) for name, field in columns.items()},
+            )
+            _SCHEMA_METADATA[cls] = metadata
+        return metadata
+
     @classmethod
     def get_columns(cls) -> Dict[str, pa.Field]:
         """Return expanded column dictionary."""
-        return {k: v for k, v in cls.to_schema().columns.items()}
+        return dict(cls.get_metadata().columns)
 
     @classmethod
     def get_column_names(cls) -> List[str]:
         """Get list of physical column names."""
-        return [name for name in cls.get_columns()]
+        return list(cls.get_metadata().column_names)
 
     @classmethod
     def get_column_types(cls) -> List[str]:
         """Get list of column target types."""
-        return [v for _, v in cls.get_columns().items()]
+        return list(cls.get_metadata().columns.values())
 
     @classmethod
     def handle_missing_columns(cls, data: pd.DataFrame) -> pd.DataFrame:
         """Add missing optional columns and check for missing required columns."""
+        metadata = cls.get_metadata()
         data = data.copy()
-        for name, field in cls.get_columns().items():
-            col_type = field.dtype.type
-            if field.nullable:
+        for name, col_type in metadata.dtypes.items():
+            if metadata.nullable[name]:
                 if name not in data.columns:
                     if col_type == int or col_type == float:
                         data[name] = pd.Series([np.NaN] * len(data), dtype=col_type)
@@ -76,49 +118,214 @@ class BaseSchema(pa.SchemaModel):
         return data
 
     @classmethod
-    def cast(cls, data: pd.DataFrame) -> pd.DataFrame:
-        """Cast columns to target column types defined in Column class."""
-        for name, field in cls.get_columns().items():
-            col = name
-            col_type = field.dtype.type
-            if col in data.columns:
-                if col_type == str:
-                    data[col] = data[col].replace({np.nan: None}).astype(col_type).replace({"None": None})
-                elif col_type == int:
-                    # Using Int64Dtype to handle null values and avoid conversion to float
-                    data[col] = np.floor(pd.to_numeric(data[col], errors="coerce")).astype(pd.Int64Dtype())
-                elif col_type == float:
-                    data[col] = pd.to_numeric(data[col], errors="coerce").astype(pd.Float64Dtype())
-                elif (col_type == bool) and (data[col].dtypes == object):
-                    data[col] = data[col].fillna("False").astype(str).str.lower() == "true"
-                else:
-                    data[col] = data[col].astype(col_type)
+    def cast(cls, data: pd.DataFrame, max_workers: int = None) -> pd.DataFrame:
+        """Cast columns to target column types defined in Column class.
+
+        Columns already of the target dtype are skipped, see `cast_series`. With `max_workers`
+        columns are converted concurrently on a thread pool.
+        """
+        items = [(col, col_type) for col, col_type in cls.get_metadata().dtypes.items() if col in data.columns]
+        if max_workers and max_workers > 1 and len(items) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                cast_columns = list(executor.map(lambda item: cast_series(data[item[0]], item[1]), items))
+        else:
+            cast_columns = [cast_series(data[col], col_type) for col, col_type in items]
+        for (col, _), series in zip(items, cast_columns):
+            if series is not None:
+                data[col] = series
+        return data
+
+    @classmethod
+    def compact(cls, data: pd.DataFrame, observed: bool = True) -> pd.DataFrame:
+        """Downcast cast columns to the narrowest safe numpy dtype and enum columns to category.
+
+        Ranges come from the declared bounds, else with `observed` from the data. Without
+        `observed` the dtypes only depend on the schema, e.g. for chunks appended to one file.
+        """
+        metadata = cls.get_metadata()
+        enum = cls.get_enum()
+        memory_before = data.memory_usage(deep=True).sum()
+        for col, col_type in metadata.dtypes.items():
+            if col not in data.columns:
+                continue
+            if col in enum:
+                data[col] = to_categorical(data[col], categories=enum[col])
+            elif col_type == int or col_type == float:
+                compact_dtype = get_compact_dtype(
+                    series=data[col],
+                    col_type=col_type,
+                    bounds=metadata.bounds[col],
+                    nullable=metadata.nullable[col],
+                    observed=observed,
+                )
+                if compact_dtype is not None:
+                    data[col] = data[col].to_numpy(dtype=compact_dtype, na_value=np.nan)
+        memory_after = data.memory_usage(deep=True).sum()
+        logger.info(
+            f"{cls._label} compact dtypes: {memory_before / 2**20:.2f} MB -> {memory_after / 2**20:.2f} MB, "
+            f"saved {1 - memory_after / max(memory_before, 1):.0%}"
+        )
         return data
 
     @classmethod
-    def validate(cls, data: pd.DataFrame, **kwargs) -> None:
-        """Apply all the data quality checks."""
-        super().validate(data, **kwargs)
+    def validate(
+        cls,
+        data: pd.DataFrame,
+        max_workers: int = None,
+        chunksize: int = None,
+        sample: int = None,
+        random_state: int = None,
+        **kwargs,
+    ) -> None:
+        """Apply all the data quality checks.
+
+        pandera checks run on `sample` random rows when given, and on chunks of `chunksize` rows
+        across `max_workers` processes, so dataframe-wide pandera checks only hold per chunk.
+        Primary key and enum checks always run vectorized on the full data.
+        """
+        checked = data.sample(n=sample, random_state=random_state) if sample and len(data) > sample else data
+        if max_workers and max_workers > 1 and chunksize and len(checked) > chunksize:
+            chunks = (checked.iloc[i : i + chunksize] for i in range(0, len(checked), chunksize))
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(validate_chunk, repeat(cls), chunks, repeat(kwargs)))
+        else:
+            cls.get_metadata().schema.validate(checked, **kwargs)
         cls.check_primary_key(data)
         cls.check_enum_values(data)
 
     @classmethod
     def check_primary_key(cls, data: pd.DataFrame) -> None:
-        """Check if primary constraint is verified."""
-        if cls.primary_key():
-            is_unique = not data.duplicated(cls.get_primary_key()).sum()
-            if not is_unique:
-                raise PrimaryKeyError(f"{cls._label} - Primary key: {cls.get_primary_key()} is not unique")
+        """Check if primary constraint is verified.
+
+        Rows are hashed to uint64 and sorted, only rows sharing a hash are compared on their values.
+        """
+        primary_key = cls.get_primary_key()
+        if primary_key:
+            hashes = pd.util.hash_pandas_object(data[primary_key], index=False).to_numpy()
+            sorted_hashes = np.sort(hashes)
+            duplicated_hashes = sorted_hashes[1:][sorted_hashes[1:] == sorted_hashes[:-1]]
+            if len(duplicated_hashes):
+                is_candidate = np.isin(hashes, duplicated_hashes)
+                if data.loc[is_candidate, primary_key].duplicated().any():
+                    raise PrimaryKeyError(f"{cls._label} - Primary key: {primary_key} is not unique")
 
     @classmethod
     def check_enum_values(cls, data: pd.DataFrame) -> None:
-        """Check authorized values constraint is verified."""
+        """Check authorized values constraint is verified, on the unique values of each column."""
         for k, v in cls.enum().items():
-            col_values = set(data[k].unique())
-            col_values = col_values.difference([None, "None", np.nan])
+            col_values = pd.Series(data[k].unique(), dtype=object)
+            is_invalid = ~col_values.isin(list(v) + ["None"]) & col_values.notna()
+            if is_invalid.any():
+                raise ValueError(f"{cls._label} - Invalid values for column {k}: {set(col_values[is_invalid])}")
+
+
+def validate_chunk(schema: BaseSchema, chunk: pd.DataFrame, kwargs: Dict) -> None:
+    """Run the pandera checks of schema on a chunk, module level so it can be shipped to a process pool."""
+    schema.get_metadata().schema.validate(chunk, **kwargs)
+
+
+def cast_series(series: pd.Series, col_type: Any) -> Optional[pd.Series]:
+    """Convert series to the target type of a schema column in one conversion, None if already of that type.
+
+    int and float columns become nullable Int64 (floored) and Float64, unparsable values become
+    missing. Numeric columns are wrapped without copying where possible, so the result may share
+    memory with the input. str columns hold str values with None for missing values.
+    """
+    dtype = series.dtype
+    if col_type == str:
+        is_str = dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "string"
+        values = series if is_str else series.astype(str)
+        is_missing = series.isna().to_numpy() | (values.to_numpy() == "None")
+        if is_str and all(value is None for value in values.to_numpy()[is_missing]):
+            return None
+        return values.where(~is_missing, None) if is_missing.any() else values
+    elif col_type == int:
+        if dtype == pd.Int64Dtype():
+            return None
+        if pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_extension_array_dtype(dtype):
+            array = pd.arrays.IntegerArray(series.to_numpy(dtype=np.int64), np.zeros(len(series), dtype=bool))
+        else:
+            values = np.floor(get_float_values(series))
+            mask = np.isnan(values)
+            if np.isinf(values).any():
+                raise ValueError(f"Cannot convert non-finite values (NA or inf) to integer: {series.name}")
+            values[mask] = 0
+            array = pd.arrays.IntegerArray(values.astype(np.int64), mask)
+    elif col_type == float:
+        if dtype == pd.Float64Dtype():
+            return None
+        values = get_float_values(series)
+        array = pd.arrays.FloatingArray(values, np.isnan(values))
+    elif col_type == bool and dtype == object:
+        # values are compared once per unique value, missing values read as False
+        codes, uniques = pd.factorize(series)
+        is_true = np.array([str(value).lower() == "true" for value in uniques] + [False])
+        array = is_true[codes]
+    elif dtype == col_type:
+        return None
+    else:
+        return series.astype(col_type)
+    return pd.Series(array, index=series.index, name=series.name, copy=False)
+
+
+def get_float_values(series: pd.Series) -> np.ndarray:
+    """Get series as float64 array with NaN for missing and unparsable values."""
+    if not pd.api.types.is_numeric_dtype(series.dtype):
+        series = pd.to_numeric(series, errors="coerce")
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def get_declared_bounds(column: pa.Column) -> Tuple[Optional[float], Optional[float]]:
+    """Get (min, max) values allowed by the ge, gt, le, lt and in_range checks of a column."""
+    min_value, max_value = None, None
+    for check in column.checks:
+        statistics = check.statistics or {}
+        if check.name in ("greater_than_or_equal_to", "greater_than", "in_range"):
+            min_value = statistics.get("min_value", min_value)
+        if check.name in ("less_than_or_equal_to", "less_than", "in_range"):
+            max_value = statistics.get("max_value", max_value)
+    return min_value, max_value
+
+
+def get_compact_dtype(
+    series: pd.Series,
+    col_type: Any,
+    bounds: Tuple[Optional[float], Optional[float]],
+    nullable: bool,
+    observed: bool = True,
+) -> Optional[np.dtype]:
+    """Narrowest numpy dtype holding the values of a numeric schema column, None to keep its dtype.
+
+    Integer columns which can hold missing values become float32 when exact, i.e. below 2**24.
+    """
+    min_value, max_value = bounds
+    if observed and series.notna().any():
+        min_value = series.min() if min_value is None else min_value
+        max_value = series.max() if max_value is None else max_value
+    is_known = min_value is not None and max_value is not None
+    if col_type == int and not (nullable or series.hasnans):
+        if not is_known:
+            return None
+        for dtype in (np.int8, np.int16, np.int32, np.int64):
+            if np.iinfo(dtype).min <= min_value and max_value <= np.iinfo(dtype).max:
+                return np.dtype(dtype)
+        return None
+    elif col_type == int:
+        is_exact = is_known and max(abs(min_value), abs(max_value)) <= 2**24
+        return np.dtype(np.float32 if is_exact else np.float64)
+    if is_known and max(abs(min_value), abs(max_value)) > np.finfo(np.float32).max:
+        return np.dtype(np.float64)
+    return np.dtype(np.float32)
+
 
-            if not col_values.issubset(set(v)):
-                raise ValueError(f"{cls._label} - Invalid values for column" + f"{k}: {col_values.difference(set(v))}")
+def to_categorical(series: pd.Series, categories: List) -> pd.Series:
+    """Convert series to category dtype of the enum values, keeping values outside the enum."""
+    categorical = series.astype(pd.CategoricalDtype(categories=list(categories)))
+    is_unknown = categorical.isna() & series.notna()
+    if is_unknown.any():
+        logger.warning(f"{series.name} has values outside its enum: {series[is_unknown].unique()[:10]}")
+        categorical = series.astype("category")
+    return categorical
 
 
 class EnumSchema(str, Enum):
@@ -28,8 +28,8 @@ class FeatureData(BaseSchema):
     # x6_longitude: location measure
     x6_longitude: Series[float] = Field()
 
-    # x7_longitude: location measure
-    x7_longitude: Series[float] = Field()
+    # x7_haversine_distance: in kms, from the (0, 0) lat-long coordinate
+    x7_haversine_distance: Series[float] = Field()
 
     # y_house_price_of_unit_area: our target
     y_house_price_of_unit_area: Series[float] = Field()
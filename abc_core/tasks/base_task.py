@@ -1,12 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Dict, List, Tuple
 
 
 class Task(ABC):
     name = None
+    # parameter names consumed from upstream tasks, None runs after all previous tasks
+    inputs: Tuple[str, ...] = None
+    # parameter names returned by the `run` method
+    outputs: Tuple[str, ...] = ()
+    # whether results can be reused from the task cache, see `pipelines/core/task_cache.py`
+    cacheable: bool = False
+    # dotted config subtrees read by the task, part of the task cache key
+    config_keys: Tuple[str, ...] = ()
 
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, **args):
         self.config = config
+        # outputs of upstream tasks held in memory, tasks run on their own load them from file
+        self.upstream = {k: v for k, v in args.items() if self.inputs is None or k in self.inputs}
 
     @abstractmethod
     def _load_inputs(self, **kwargs):
@@ -19,3 +29,11 @@ class Task(ABC):
     @abstractmethod
     def _save_results(self, **kwargs):
         pass
+
+    def input_artefacts(self) -> Dict[str, str]:
+        """Files read by the task, keyed by the matching parameter name."""
+        return {}
+
+    def output_artefacts(self) -> List[str]:
+        """Files written by the task."""
+        return []
@@ -1,9 +1,9 @@
 import logging
-from typing import Dict
+from typing import Dict, Iterator
 
 import pandas as pd
 from abc_core.tasks.base_task import Task
-from abc_core.utils.read_write import read_file, write_file
+from abc_core.utils.read_write import get_parquet_options, read_file, read_files, write_file
 from abc_core.utils.transform import apply_schema, handle_datetime_dtype
 
 from abc_core.schema.dummy_data import DummyData
@@ -16,17 +16,24 @@ class ProcessDummyData(Task):
     """Loads raw data and outputs it."""
 
     name = "process_dummy_data"
+    inputs = ()
+    outputs = ("dummy_data",)
 
     def __init__(
         self,
         config: Dict,
         **args,
     ):
-        self.config = config
+        super().__init__(config=config, **args)
         self.input_data = config.data.raw_data
         self.output_data = config.data.processed_data
 
     def run(self):
+        streaming_config = self.config.data_processing.streaming
+        if streaming_config.enabled:
+            self._run_streaming(chunksize=streaming_config.chunksize)
+            return {}  # processed data is not held in memory in streaming mode
+
         in_df = self._load_inputs()
 
         out_df = self._process_data(df=in_df)
@@ -35,28 +42,51 @@ class ProcessDummyData(Task):
 
         return {"dummy_data": out_df}
 
-    def _load_inputs(self, **kwargs) -> pd.DataFrame:
+    def _run_streaming(self, chunksize: int):
+        """Process and write raw data chunk by chunk, peak memory is bounded by the chunk size."""
+        self._save_results(df=self._iter_processed_chunks(chunksize=chunksize))
+
+    def _iter_processed_chunks(self, chunksize: int) -> Iterator[pd.DataFrame]:
+        """Processed chunks of the raw data, read and processed lazily while they are written."""
+        for i, in_df in enumerate(self._load_inputs(chunksize=chunksize)):
+            logger.info(f"Processing chunk {i} of {len(in_df)} rows.")
+            # compact dtypes only depend on the schema so every chunk is written with the same dtypes
+            yield self._process_data(df=in_df, observed=False)
+
+    def _load_inputs(self, chunksize: int = None, **kwargs) -> pd.DataFrame | Iterator[pd.DataFrame]:
         """."""
         logger.info("Loading raw dummy data table.")
-        df = read_file(
-            base_directory=self.input_data.base_directory,
-            time_connector=self.config.run_details.raw_data_version,
-            file_name=self.input_data.tables.dummy_data,
-        )
+        dummy_data_spec = {
+            "schema": DummyData,
+            "column_mapping": self.get_column_mapping(),
+            "csv_engine": self.input_data.get("csv_engine", "python"),
+            "base_directory": self.input_data.base_directory,
+            "time_connector": self.config.run_details.raw_data_version,
+            "file_name": self.input_data.tables.dummy_data,
+        }
+        if chunksize:
+            return read_file(read_type="pandas_chunks", chunksize=chunksize, **dummy_data_spec)
 
-        return df
+        # NOTE: further raw tables added to the specs are read concurrently
+        tables = read_files(
+            table_specs={"dummy_data": dummy_data_spec},
+            max_workers=self.input_data.get("max_workers"),
+        )
+        return tables["dummy_data"]
 
-    def _save_results(self, df: pd.DataFrame):
+    def _save_results(self, df: pd.DataFrame | Iterator[pd.DataFrame]):
         """."""
         logger.info("Writing processed dummy table to file.")
         write_file(
             out_obj=df,
+            partition_on=self.output_data.get("partition_on"),
             base_directory=self.output_data.base_directory,
             time_connector=self.config.run_details.processed_data_version,
             file_name=self.output_data.tables.dummy_data,
+            parquet_options=get_parquet_options(self.output_data, "dummy_data"),
         )
 
-    def _process_data(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _process_data(self, df: pd.DataFrame, observed: bool = True) -> pd.DataFrame:
         """Orchestration method."""
         logger.info("Rename columns to match designated schema.")
         df = self.rename_sales_columns(df=df)
@@ -69,14 +99,27 @@ class ProcessDummyData(Task):
         df = handle_datetime_dtype(df=df, col=n.F_X1_TRANSACTION_DATE, format="%Y-%m-%d")
 
         logger.info("Apply schema to processed data.")
-        df = apply_schema(df=df, schema=DummyData)
+        df = apply_schema(
+            df=df,
+            schema=DummyData,
+            compact=self.config.data_processing.get("compact_dtypes", False),
+            observed=observed,
+            validation=self.get_validation_options(),
+        )
         
         return df
     
+    def get_validation_options(self) -> Dict | None:
+        """Keyword arguments of `DummyData.validate`, None when validation is disabled."""
+        validation_config = self.config.data_processing.get("validation", {})
+        if not validation_config.get("enabled", False):
+            return None
+        return {k: v for k, v in validation_config.items() if k != "enabled"}
+
     # NOTE: to be over-written by future developers
-    def rename_sales_columns(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Rename columns to match designated schema."""
-        column_mapping = {  # NOTE: see dummy_data.py for schema
+    def get_column_mapping(self) -> Dict[str, str]:
+        """Mapping of raw column names to designated schema."""
+        return {  # NOTE: see dummy_data.py for schema
             "x1_transaction_date": n.F_X1_TRANSACTION_DATE,
             "x2_house_age": n.F_X2_HOUSE_AGE,
             "x3_distance_to_the_nearest_mrt_station": n.F_X3_DISTANCE_TO_NEAREST_STATION,
@@ -85,5 +128,8 @@ class ProcessDummyData(Task):
             "x6_longitude": n.F_X6_LONGITUDE,
             "y_house_price_of_unit_area": n.F_Y_HOUSE_PRICE_OF_UNIT_AREA,
         }
-        df = df.rename(columns=column_mapping, errors="raise")
+
+    def rename_sales_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rename columns to match designated schema."""
+        df = df.rename(columns=self.get_column_mapping(), errors="raise")
         return df
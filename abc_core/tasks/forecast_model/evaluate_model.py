@@ -3,8 +3,9 @@ from typing import Dict, List, Tuple
 import pandas as pd
 
 from abc_core.tasks.base_task import Task
-from abc_core.utils.read_write import read_file, write_file
+from abc_core.utils.read_write import get_file_path, get_parquet_options, read_file, write_file
 from abc_core.utils.evaluate import get_accuracy_metrics
+from abc_core.utils.out_of_core import predict_shards
 
 logger = logging.getLogger(__name__)
 
@@ -13,13 +14,15 @@ class EvaluateForecastModel(Task):
     """Evaluate forecasting model using test set."""
 
     name = "evaluate_model"
+    inputs = ("train_data", "model_fit")
+    outputs = ("fit_metrics",)
 
     def __init__(
         self,
         config: Dict,
         **args,
     ):
-        self.config = config
+        super().__init__(config=config, **args)
         self.input_data = config.data.output_data
         self.output_data = config.data.output_data
 
@@ -34,21 +37,31 @@ class EvaluateForecastModel(Task):
 
     def _load_inputs(self, **kwargs):
         """."""
-        logger.info("Loading feature data table.")
-        model_tuned = read_file(
-            read_type="sklearn_model",
-            base_directory=self.input_data.base_directory,
-            pipeline_name=self.config.run_details.pipeline,
-            time_connector=self.config.run_details.run_version,
-            file_name=self.input_data.models.ml_model,
-        )
-        train_data = read_file(
-            read_type="python_dict",
-            base_directory=self.input_data.base_directory,
-            pipeline_name=self.config.run_details.pipeline,
-            time_connector=self.config.run_details.run_version,
-            file_name=self.input_data.dicts.train_data,
-        )
+        if "model_fit" in self.upstream:
+            logger.info("Using sklearn model fit object from upstream task.")
+            model_tuned = self.upstream["model_fit"]
+        else:
+            logger.info("Loading sklearn model fit object.")
+            model_tuned = read_file(
+                read_type="sklearn_model",
+                base_directory=self.input_data.base_directory,
+                pipeline_name=self.config.run_details.pipeline,
+                time_connector=self.config.run_details.run_version,
+                file_name=self.input_data.models.ml_model,
+            )
+
+        if "train_data" in self.upstream:
+            logger.info("Using training data dict from upstream task.")
+            train_data = self.upstream["train_data"]
+        else:
+            logger.info("Loading training data dict.")
+            train_data = read_file(
+                read_type="python_dict",
+                base_directory=self.input_data.base_directory,
+                pipeline_name=self.config.run_details.pipeline,
+                time_connector=self.config.run_details.run_version,
+                file_name=self.input_data.dicts.train_data,
+            )
         return model_tuned, train_data
 
     def _save_results(self, metrics: dict, pred_train_df: pd.DataFrame, pred_test_df: pd.DataFrame):
@@ -67,6 +80,7 @@ class EvaluateForecastModel(Task):
             pipeline_name=self.config.run_details.pipeline,
             time_connector=self.config.run_details.run_version,
             file_name=self.output_data.tables.predict_train,
+            parquet_options=get_parquet_options(self.output_data, "predict_train"),
         )
         write_file(
             out_obj=pred_test_df,
@@ -74,16 +88,26 @@ class EvaluateForecastModel(Task):
             pipeline_name=self.config.run_details.pipeline,
             time_connector=self.config.run_details.run_version,
             file_name=self.output_data.tables.predict_test,
+            parquet_options=get_parquet_options(self.output_data, "predict_test"),
         )
 
     def _evaluate_metrics(self, model, data: pd.DataFrame, metrics: dict = {}):
         """Orchestration method."""
-        X_train, X_test = data["X_train"], data["X_test"]
-        y_train, y_test = data["y_train"], data["y_test"]
-
         logger.info("Get predictions for the test set.")
-        pred_train_df = pd.DataFrame({"y_true": y_train, "y_pred": model.predict(X_train)})
-        pred_test_df = pd.DataFrame({"y_true": y_test, "y_pred": model.predict(X_test)})
+        if "shards" in data:
+            shard_path = get_file_path(
+                base_directory=self.input_data.base_directory,
+                pipeline_name=self.config.run_details.pipeline,
+                time_connector=self.config.run_details.run_version,
+                file_name=data["shard_directory"],
+            )
+            pred_train_df = predict_shards(model=model, manifest=data, shard_path=shard_path, split="train")
+            pred_test_df = predict_shards(model=model, manifest=data, shard_path=shard_path, split="test")
+        else:
+            X_train, X_test = data["X_train"], data["X_test"]
+            y_train, y_test = data["y_train"], data["y_test"]
+            pred_train_df = pd.DataFrame({"y_true": y_train, "y_pred": model.predict(X_train)})
+            pred_test_df = pd.DataFrame({"y_true": y_test, "y_pred": model.predict(X_test)})
 
         logger.info("Calculate fit metrics.")
         metrics = get_accuracy_metrics(metrics, pred_train_df, "train")
@@ -1,13 +1,24 @@
 import logging
-from typing import Dict
+from typing import Dict, List
 
 import pandas as pd
 from abc_core.tasks.base_task import Task
-from abc_core.utils.read_write import read_file, write_file
+from abc_core.utils.read_write import (
+    get_date_range_filters,
+    get_file_path,
+    get_parquet_options,
+    read_file,
+    write_file,
+)
+from abc_core.utils import basis_fcns, feature_fcns
+from abc_core.utils.basis_fcns import get_basis_expansion_names
+from abc_core.utils.feature_fcns import FEATURE_REGISTRY, compute_basis_features, compute_features
+from abc_core.utils.feature_store import FeatureStore, get_feature_fingerprint
+from abc_core.utils.temporal import compute_temporal_features
 
 from abc_core.schema.dummy_data import DummyData
+from abc_core.schema.feature_data import FeatureData
 from abc_core.constant import name as n
-from math import radians, cos, sin, asin, sqrt
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +27,22 @@ class FeatureEngineering(Task):
     """Prepares custom features used in forecast model."""
 
     name = "feature_engineering"
+    inputs = ()
+    outputs = ("feature_data",)
+    cacheable = True
+    config_keys = (
+        "forecast_model.date_range",
+        "forecast_model.basis_expansion",
+        "forecast_model.temporal_features",
+        "data_processing.compact_dtypes",
+    )
 
     def __init__(
         self,
         config: Dict,
         **args,
     ):
-        self.config = config
+        super().__init__(config=config, **args)
         self.input_data = config.data.processed_data
         self.output_data = config.data.output_data
 
@@ -38,8 +58,11 @@ class FeatureEngineering(Task):
     def _load_inputs(self, **kwargs) -> pd.DataFrame:
         """."""
         logger.info("Loading processed data table.")
+        date_range = self.config.forecast_model.date_range
         df = read_file(
             schema=DummyData,
+            partition_on=self.input_data.get("partition_on"),
+            filters=get_date_range_filters(col=n.F_X1_TRANSACTION_DATE, start=date_range.start, end=date_range.end),
             base_directory=self.input_data.base_directory,
             time_connector=self.config.run_details.processed_data_version,
             file_name=self.input_data.tables.dummy_data,
@@ -47,6 +70,25 @@ class FeatureEngineering(Task):
 
         return df
 
+    def input_artefacts(self) -> Dict[str, str]:
+        """."""
+        path = get_file_path(
+            base_directory=self.input_data.base_directory,
+            time_connector=self.config.run_details.processed_data_version,
+            file_name=self.input_data.tables.dummy_data,
+        )
+        return {"dummy_data": path}
+
+    def output_artefacts(self) -> List[str]:
+        """."""
+        path = get_file_path(
+            pipeline_name=self.config.run_details.pipeline,
+            base_directory=self.output_data.base_directory,
+            time_connector=self.config.run_details.run_version,
+            file_name=self.output_data.tables.feature_data,
+        )
+        return [path]
+
     def _save_results(self, out_df):
         """."""
         logger.info("Writing feature variables table to file.")
@@ -56,35 +98,71 @@ class FeatureEngineering(Task):
             base_directory=self.output_data.base_directory,
             time_connector=self.config.run_details.run_version,
             file_name=self.output_data.tables.feature_data,
+            parquet_options=get_parquet_options(self.output_data, "feature_data"),
         )
 
     def _create_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Orchestration method."""
-        logger.info("Adding feature: haversine point combines lat and lng.")
-        df[n.F_X7_HAVERSINE_DISTANCE] = self.compute_haversine_distance(lat=df[n.F_X5_LATITUDE], lng=df[n.F_X6_LONGITUDE])
+        store_config = self.config.get("feature_store", {})
+        if store_config.get("enabled", False):
+            logger.info("Adding row-wise features, reusing stored features of unchanged rows.")
+            df = FeatureStore(config=store_config).compute(
+                df=df,
+                compute_fcn=self.compute_row_features,
+                input_columns=self.get_feature_inputs(),
+                feature_columns=self.get_feature_names(),
+                fingerprint=self.get_feature_fingerprint(),
+                version=self.config.run_details.processed_data_version,
+            )
+        else:
+            df = self.compute_row_features(df=df)
+
+        temporal_config = self.config.forecast_model.get("temporal_features", {})
+        if temporal_config.get("enabled", False):
+            logger.info("Adding lag, rolling and expanding features over transaction dates.")
+            features = compute_temporal_features(df=df, temporal_config=temporal_config)
+            df = pd.concat([df, pd.DataFrame(features, index=df.index)], axis=1)
+
+        if self.config.data_processing.get("compact_dtypes", False):
+            logger.info("Downcast feature columns to compact dtypes.")
+            df = FeatureData.compact(df)
 
-        # logger.info("Adding feature: [xx].")
-        # NOTE: add new feature variables here!
-        
         return df
 
-    def compute_haversine_distance(self, lat: pd.Series, lng: pd.Series) -> pd.Series:
-        """Apply haversine calculation to pandas series."""
-        return [self.single_pt_haversine(x, y) for x, y in zip(lat, lng)]
-
-    def single_pt_haversine(self, lat, lng, degrees=True):
-        """
-        'Single-point' Haversine: Calculates the great circle distance
-        between a point on Earth and the (0, 0) lat-long coordinate
-        """
-        r = 6371 # Earth's radius (km). Have r = 3956 if you want miles
-
-        # Convert decimal degrees to radians
-        if degrees:
-            lat, lng = map(radians, [lat, lng])
-
-        # 'Single-point' Haversine formula
-        a = sin(lat/2)**2 + cos(lat) * sin(lng/2)**2
-        d = 2 * r * asin(sqrt(a)) 
+    def compute_row_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add features computed row by row from the processed columns: registry and basis expansion."""
+        logger.info("Adding registered features as vectorized column operations.")
+        # NOTE: add new feature variables to FEATURE_REGISTRY in utils/feature_fcns.py
+        max_workers = self.config.forecast_model.get("feature_registry", {}).get("max_workers", 1)
+        df = compute_features(df=df, registry=FEATURE_REGISTRY, max_workers=max_workers)
+
+        basis_config = self.config.forecast_model.get("basis_expansion", {})
+        if basis_config.get("enabled", False):
+            logger.info("Expanding columns through basis functions in one broadcasted pass.")
+            df = compute_basis_features(df=df, columns=basis_config.columns, functions=basis_config.functions)
+        return df
 
-        return d
+    def get_feature_names(self) -> List[str]:
+        """Columns added by `compute_row_features`."""
+        feature_names = list(FEATURE_REGISTRY)
+        basis_config = self.config.forecast_model.get("basis_expansion", {})
+        if basis_config.get("enabled", False):
+            feature_names += get_basis_expansion_names(columns=basis_config.columns, functions=basis_config.functions)
+        return feature_names
+
+    def get_feature_inputs(self) -> List[str]:
+        """Processed columns read by `compute_row_features`."""
+        input_columns = [col for _, cols in FEATURE_REGISTRY.values() for col in cols]
+        basis_config = self.config.forecast_model.get("basis_expansion", {})
+        if basis_config.get("enabled", False):
+            input_columns += list(basis_config.columns)
+        return sorted(set(input_columns))
+
+    def get_feature_fingerprint(self) -> str:
+        """Fingerprint of the row-wise feature definitions and the code computing them."""
+        basis_config = self.config.forecast_model.get("basis_expansion", {})
+        definition = {
+            "registry": {name: [fcn.__name__, cols] for name, (fcn, cols) in FEATURE_REGISTRY.items()},
+            "basis_expansion": basis_config.to_dict() if basis_config.get("enabled", False) else None,
+        }
+        return get_feature_fingerprint(definition=definition, source_files=[feature_fcns.__file__, basis_fcns.__file__])
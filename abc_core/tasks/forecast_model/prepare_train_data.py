@@ -1,12 +1,22 @@
 import logging
-from typing import Dict, List, Tuple
+import os
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
 import pandas as pd
 
+from scipy import sparse
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
+from abc_core.constant import name as n
 from abc_core.tasks.base_task import Task
-from abc_core.utils.read_write import read_file, write_file
+from abc_core.utils.basis_fcns import get_basis_expansion_names
+from abc_core.utils.encoding import CategoricalEncoder
+from abc_core.utils.spatial import SpatialIndex, compute_spatial_features, get_spatial_feature_names
+from abc_core.utils.out_of_core import get_test_mask, to_matrix
+from abc_core.utils.read_write import ARRAY_BUNDLE_EXT, get_file_path, read_file, remove_path, write_file
+from abc_core.utils.temporal import get_date_cutoff, get_temporal_feature_names
+from abc_core.utils.write_behind import flush_pending_writes
 
 logger = logging.getLogger(__name__)
 
@@ -15,20 +25,43 @@ class PrepareTrainingData(Task):
     """Prepares train and test data used in forecast model."""
 
     name = "prepare_training_data"
+    inputs = ("feature_data",)
+    outputs = ("train_data",)
+    cacheable = True
+    config_keys = (
+        "forecast_model.target",
+        "forecast_model.features",
+        "forecast_model.test_split",
+        "forecast_model.random_state",
+        "forecast_model.model_type",
+        "forecast_model.basis_expansion",
+        "forecast_model.spatial_features",
+        "forecast_model.temporal_features",
+        "forecast_model.design_matrix",
+        "forecast_model.out_of_core",
+        "forecast_model.categorical_encoding",
+    )
 
     def __init__(
         self,
         config: Dict,
         **args,
     ):
-        self.config = config
+        super().__init__(config=config, **args)
         self.input_data = config.data.output_data
         self.output_data = config.data.output_data
+        self.spatial_config = config.forecast_model.get("spatial_features", {})
+        self.temporal_config = config.forecast_model.get("temporal_features", {})
+        self.design_config = config.forecast_model.get("design_matrix", {})
+        self.out_of_core_config = config.forecast_model.get("out_of_core", {})
+        self.categorical_encoder = None
 
     def run(self):
-        feature_df = self._load_inputs()
-
-        train_data = self._prepare_data(df=feature_df)
+        if self.out_of_core_config.get("enabled", False):
+            train_data = self.prepare_out_of_core()
+        else:
+            feature_df = self._load_inputs()
+            train_data = self._prepare_data(df=feature_df)
 
         self._save_results(train_data=train_data)
 
@@ -36,15 +69,47 @@ class PrepareTrainingData(Task):
 
     def _load_inputs(self, **kwargs) -> pd.DataFrame:
         """."""
+        if "feature_data" in self.upstream:
+            logger.info("Using feature data table from upstream task.")
+            return self.upstream["feature_data"]
+
         logger.info("Loading feature data table.")
         feature_df = read_file(
+            columns=self.get_training_columns(),
             base_directory=self.input_data.base_directory,
             pipeline_name=self.config.run_details.pipeline,
-            time_connector=self.config.run_details.processed_data_version,
+            time_connector=self.config.run_details.run_version,
             file_name=self.input_data.tables.feature_data,
         )
         return feature_df
 
+    def input_artefacts(self) -> Dict[str, str]:
+        """."""
+        path = get_file_path(
+            base_directory=self.input_data.base_directory,
+            pipeline_name=self.config.run_details.pipeline,
+            time_connector=self.config.run_details.run_version,
+            file_name=self.input_data.tables.feature_data,
+        )
+        return {"feature_data": path}
+
+    def output_artefacts(self) -> List[str]:
+        """."""
+        file_names = [self.output_data.dicts.train_data]
+        if self.out_of_core_config.get("enabled", False):
+            file_names.append(self.out_of_core_config.shard_directory)
+        if self.get_categorical_features():
+            file_names.append(self.output_data.models.categorical_encoder)
+        return [
+            get_file_path(
+                pipeline_name=self.config.run_details.pipeline,
+                base_directory=self.output_data.base_directory,
+                time_connector=self.config.run_details.run_version,
+                file_name=file_name,
+            )
+            for file_name in file_names
+        ]
+
     def _save_results(self, train_data: Dict):
         """."""
         logger.info("Writing training data dict to file.")
@@ -55,12 +120,24 @@ class PrepareTrainingData(Task):
             time_connector=self.config.run_details.run_version,
             file_name=self.output_data.dicts.train_data,
         )
+        if self.categorical_encoder is not None:
+            logger.info("Writing categorical encoder to file.")
+            write_file(
+                out_obj=self.categorical_encoder,
+                pipeline_name=self.config.run_details.pipeline,
+                base_directory=self.output_data.base_directory,
+                time_connector=self.config.run_details.run_version,
+                file_name=self.output_data.models.categorical_encoder,
+            )
 
     def _prepare_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Orchestration method."""
         target = self.config.forecast_model.target
-        numeric_features = self.config.forecast_model.features.numeric
-        categorical_features = self.config.forecast_model.features.categorical
+        numeric_features = self.get_numeric_features()
+        categorical_features = self.get_categorical_features()
+
+        if self.design_config.get("enabled", False):
+            return self.prepare_design_matrices(df=df, numeric_features=numeric_features)
 
         logger.info("Select feature variables to be used.")
         X = self.select_training_features(
@@ -71,22 +148,47 @@ class PrepareTrainingData(Task):
         y = df[target].copy()
 
         logger.info("Split into train vs test datasets.")
-        state = self.config.forecast_model.random_state
-        test_split = self.config.forecast_model.test_split
-        (X_train, X_test, y_train, y_test) = train_test_split(
-            X,
-            y,
-            test_size=test_split,
-            random_state=state,
-        )
+        train_index, test_index = self.split_index(df=df)
+        X_train, X_test = X.loc[train_index], X.loc[test_index]
+        y_train, y_test = y.loc[train_index], y.loc[test_index]
+
+        if self.spatial_config.get("enabled", False):
+            logger.info("Adding neighbourhood features from a spatial index of the training split.")
+            X_train, X_test = self.add_spatial_features(df=df, X_train=X_train, X_test=X_test, y_train=y_train)
+            numeric_features = numeric_features + get_spatial_feature_names(self.spatial_config)
+
+        encoder = None
+        if categorical_features:
+            logger.info("Encoding categorical variables with category maps of the training split.")
+            encoder, train_encoded = self.fit_categorical_encoder(df=X_train, y_train=y_train)
+            if not encoder.is_sparse:
+                encoded_features = encoder.get_feature_names()
+                X_train = X_train.assign(**dict(zip(encoded_features, train_encoded.T)))
+                X_test = X_test.assign(**dict(zip(encoded_features, encoder.transform(X_test).T)))
+                numeric_features = numeric_features + encoded_features
 
         logger.info("Scaling numeric predictor variables.")
-        # TODO : encode and concatenate categorical variables
         X_train_scaled, X_test_scaled = self.scale_numeric_features(
             X_train=X_train,
             X_test=X_test,
             numeric_features=numeric_features,
         )
+        if self.temporal_config.get("enabled", False):
+            # temporal features are missing without earlier rows, impute the training mean after scaling
+            temporal_features = get_temporal_feature_names(self.temporal_config)
+            X_train_scaled[temporal_features] = X_train_scaled[temporal_features].fillna(0.0)
+            X_test_scaled[temporal_features] = X_test_scaled[temporal_features].fillna(0.0)
+
+        feature_names = numeric_features
+        if encoder is not None and encoder.is_sparse:
+            logger.info("Joining the sparse categorical block to the scaled numeric block.")
+            X_train_scaled = sparse.hstack(
+                [sparse.csr_matrix(X_train_scaled.to_numpy()), train_encoded], format="csr"
+            )
+            X_test_scaled = sparse.hstack(
+                [sparse.csr_matrix(X_test_scaled.to_numpy()), encoder.transform(X_test)], format="csr"
+            )
+            feature_names = numeric_features + encoder.get_feature_names()
 
         logger.info("Format output to match specified model type.")
         model_type = self.config.forecast_model.model_type
@@ -96,10 +198,322 @@ class PrepareTrainingData(Task):
             y_train=y_train,
             y_test=y_test,
             model_type=model_type,
+            feature_names=feature_names,
         )
 
         return train_data
 
+    def get_numeric_features(self) -> List[str]:
+        """Numeric features of the config, followed by the basis expansion and temporal features when enabled."""
+        numeric_features = list(self.config.forecast_model.features.numeric)
+        basis_config = self.config.forecast_model.get("basis_expansion", {})
+        if basis_config.get("enabled", False):
+            numeric_features += get_basis_expansion_names(
+                columns=basis_config.columns,
+                functions=basis_config.functions,
+            )
+        if self.temporal_config.get("enabled", False):
+            numeric_features += get_temporal_feature_names(self.temporal_config)
+        return numeric_features
+
+    def is_time_split(self) -> bool:
+        """Whether temporal features are built on the target, which needs a time-ordered split.
+
+        Windows hold the values of earlier rows, so with a random split the target features of
+        training rows would hold test targets.
+        """
+        target = self.config.forecast_model.target
+        return self.temporal_config.get("enabled", False) and target in self.temporal_config.get("columns", [])
+
+    def split_index(self, df: pd.DataFrame) -> Tuple[pd.Index, pd.Index]:
+        """Train and test index of df, split by transaction date if `is_time_split`, at random otherwise."""
+        test_split = self.config.forecast_model.test_split
+        if self.is_time_split():
+            dates = df[n.F_X1_TRANSACTION_DATE]
+            date_cutoff = get_date_cutoff(dates.value_counts(), test_split=test_split)
+            logger.info(f"Time-ordered split, testing on the rows after {date_cutoff:%Y-%m-%d}.")
+            is_test = (dates > date_cutoff).to_numpy()
+            return df.index[~is_test], df.index[is_test]
+        train_index, test_index = train_test_split(
+            df.index,
+            test_size=test_split,
+            random_state=self.config.forecast_model.random_state,
+        )
+        return train_index, test_index
+
+    def get_chunk_test_mask(self, chunk: pd.DataFrame, key_columns: List[str], date_cutoff=None) -> np.ndarray:
+        """Test rows of a row group, the rows after `date_cutoff` if given, else by a hash of the key columns."""
+        if date_cutoff is not None:
+            return (chunk[n.F_X1_TRANSACTION_DATE] > date_cutoff).to_numpy()
+        return get_test_mask(df=chunk, key_columns=key_columns, test_split=self.config.forecast_model.test_split)
+
+    def get_categorical_features(self) -> List[str]:
+        """Categorical features of the config, encoded as configured under `categorical_encoding`."""
+        return [col for col in self.config.forecast_model.features.get("categorical") or [] if col]
+
+    def fit_categorical_encoder(
+        self,
+        df: pd.DataFrame,
+        y_train: pd.Series,
+        dtype: str = "float64",
+    ) -> Tuple[CategoricalEncoder, sparse.csr_matrix | np.ndarray]:
+        """Fit the configured categorical encoder on the training rows, returned with their encoding.
+
+        Target encoded training rows are encoded out of fold, see `CategoricalEncoder.fit_transform`.
+        """
+        encoding_config = self.config.forecast_model.get("categorical_encoding", {})
+        self.categorical_encoder = CategoricalEncoder(
+            columns=self.get_categorical_features(),
+            method=encoding_config.get("method", "one_hot"),
+            n_features=encoding_config.get("n_features", 1024),
+            smoothing=encoding_config.get("smoothing", 10.0),
+            n_folds=encoding_config.get("n_folds", 5),
+            random_state=self.config.forecast_model.random_state,
+        )
+        train_encoded = self.categorical_encoder.fit_transform(df=df, y=y_train, dtype=dtype)
+        return self.categorical_encoder, train_encoded
+
+    def get_training_columns(self) -> List[str]:
+        """Columns of the feature data used for training: selected features, coordinates and target."""
+        categorical_features = self.get_categorical_features()
+        target = self.config.forecast_model.target
+        columns = list(dict.fromkeys(self.get_numeric_features() + categorical_features + [target]))
+        if self.spatial_config.get("enabled", False):
+            columns += [col for col in (n.F_X5_LATITUDE, n.F_X6_LONGITUDE) if col not in columns]
+        if self.is_time_split() and n.F_X1_TRANSACTION_DATE not in columns:
+            columns.append(n.F_X1_TRANSACTION_DATE)
+        return columns
+
+    def add_spatial_features(
+        self,
+        df: pd.DataFrame,
+        X_train: pd.DataFrame,
+        X_test: pd.DataFrame,
+        y_train: pd.Series,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Add neighbourhood features, queried against a haversine BallTree of the training rows.
+
+        Training rows are not their own neighbours, so their neighbour target mean excludes their own target.
+        """
+        features = self.compute_split_spatial_features(
+            df=df,
+            train_index=X_train.index,
+            test_index=X_test.index,
+            y_train=y_train,
+        )
+        return X_train.assign(**features["train"]), X_test.assign(**features["test"])
+
+    def compute_split_spatial_features(
+        self,
+        df: pd.DataFrame,
+        train_index: pd.Index,
+        test_index: pd.Index,
+        y_train: pd.Series,
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """Neighbourhood features of the train and test rows, see `add_spatial_features`."""
+        coordinates = {
+            split: df.loc[index, [n.F_X5_LATITUDE, n.F_X6_LONGITUDE]].to_numpy(dtype=float, na_value=np.nan)
+            for split, index in (("train", train_index), ("test", test_index))
+        }
+        lat, lng = coordinates["train"].T
+        spatial_index = SpatialIndex(
+            lat=lat,
+            lng=lng,
+            values=y_train.to_numpy(dtype=float, na_value=np.nan),
+            leaf_size=self.spatial_config.get("leaf_size", 40),
+        )
+        features = {}
+        for split in ("train", "test"):
+            lat, lng = coordinates[split].T
+            features[split] = compute_spatial_features(
+                index=spatial_index,
+                lat=lat,
+                lng=lng,
+                spatial_config=self.spatial_config,
+                exclude_self=split == "train",
+            )
+        return features
+
+    def prepare_design_matrices(self, df: pd.DataFrame, numeric_features: List[str]) -> Dict:
+        """Scaled, C-contiguous train and test matrices filled column by column from df, plus feature names.
+
+        Rows of X_train and X_test are in the order of the y_train and y_test index, features in the
+        order of `feature_names`. The matrices are the only copies of the data and are scaled in place.
+        """
+        model_type = self.config.forecast_model.model_type
+        if model_type != "ml_model":
+            raise ValueError(f"Model type {model_type} not supported by design matrices.")
+        target = self.config.forecast_model.target
+        dtype = np.dtype(self.design_config.get("dtype", "float32"))
+
+        logger.info("Split into train vs test datasets.")
+        train_index, test_index = self.split_index(df=df)
+        y_train, y_test = df.loc[train_index, target], df.loc[test_index, target]
+
+        split_features = {"train": {}, "test": {}}
+        if self.spatial_config.get("enabled", False):
+            logger.info("Adding neighbourhood features from a spatial index of the training split.")
+            split_features = self.compute_split_spatial_features(
+                df=df,
+                train_index=train_index,
+                test_index=test_index,
+                y_train=y_train,
+            )
+        encoder = None
+        categorical_features = self.get_categorical_features()
+        if categorical_features:
+            logger.info("Encoding categorical variables with category maps of the training split.")
+            encoder, train_encoded = self.fit_categorical_encoder(
+                df=df.loc[train_index, categorical_features],
+                y_train=y_train,
+                dtype=dtype,
+            )
+            if not encoder.is_sparse:
+                test_encoded = encoder.transform(df.loc[test_index, categorical_features])
+                for split, encoded in (("train", train_encoded), ("test", test_encoded)):
+                    split_features[split].update(zip(encoder.get_feature_names(), encoded.T))
+        feature_names = numeric_features + list(split_features["train"])
+
+        logger.info(f"Filling {dtype} design matrices of {len(feature_names)} features.")
+        X = {}
+        for split, index in (("train", train_index), ("test", test_index)):
+            positions = df.index.get_indexer(index)
+            X[split] = np.empty((len(index), len(feature_names)), dtype=dtype, order="C")
+            for j, col in enumerate(numeric_features):
+                X[split][:, j] = df[col].to_numpy(dtype=float, na_value=np.nan)[positions]
+            for j, values in enumerate(split_features[split].values(), start=len(numeric_features)):
+                X[split][:, j] = values
+
+        logger.info("Scaling predictor variables in place.")
+        scaler = StandardScaler(copy=False)
+        X_train = scaler.fit_transform(X["train"])
+        X_test = scaler.transform(X["test"])
+        if self.temporal_config.get("enabled", False):
+            # temporal features are missing without earlier rows, impute the training mean after scaling
+            for j in [feature_names.index(col) for col in get_temporal_feature_names(self.temporal_config)]:
+                np.nan_to_num(X_train[:, j], copy=False)
+                np.nan_to_num(X_test[:, j], copy=False)
+
+        if encoder is not None and encoder.is_sparse:
+            logger.info("Joining the sparse categorical block to the scaled numeric block.")
+            X_train = sparse.hstack(
+                [sparse.csr_matrix(X_train), train_encoded],
+                format="csr",
+            )
+            X_test = sparse.hstack(
+                [sparse.csr_matrix(X_test), encoder.transform(df.loc[test_index, categorical_features], dtype=dtype)],
+                format="csr",
+            )
+            feature_names = feature_names + encoder.get_feature_names()
+        return {
+            "X_train": X_train,
+            "X_test": X_test,
+            "y_train": y_train,
+            "y_test": y_test,
+            "feature_names": feature_names,
+        }
+
+    def prepare_out_of_core(self) -> Dict:
+        """Split, scale and shard the feature data file one parquet row group at a time.
+
+        Rows are assigned to train or test by a hash of their key columns, or by date if
+        `is_time_split`. A first pass fits the scaler with `partial_fit` on the training rows, a
+        second scales each row group and writes its train and test rows as array bundle shards.
+        Returns the manifest of the shards, see `utils/out_of_core.py` for reading them.
+        """
+        model_type = self.config.forecast_model.model_type
+        if model_type != "ml_model":
+            raise ValueError(f"Model type {model_type} not supported out of core.")
+        if self.spatial_config.get("enabled", False):
+            raise ValueError("Spatial features need the whole training split in memory, not supported out of core.")
+        if self.get_categorical_features():
+            raise ValueError("Categorical features are not supported out of core.")
+        flush_pending_writes()  # the feature data file may still be queued for writing
+
+        target = self.config.forecast_model.target
+        feature_names = self.get_numeric_features()
+        key_columns = list(self.out_of_core_config.key_columns)
+        columns = list(dict.fromkeys(feature_names + [target] + key_columns))
+        dtype = self.out_of_core_config.get("dtype", "float32")
+        temporal_positions = []
+        if self.temporal_config.get("enabled", False):
+            temporal_positions = [feature_names.index(col) for col in get_temporal_feature_names(self.temporal_config)]
+
+        date_cutoff = None
+        if self.is_time_split():
+            logger.info("Counting the rows of each date for a time-ordered split.")
+            chunks = self.iter_feature_chunks(columns=[n.F_X1_TRANSACTION_DATE])
+            date_counts = pd.concat([chunk[n.F_X1_TRANSACTION_DATE].value_counts() for chunk in chunks])
+            date_cutoff = get_date_cutoff(
+                date_counts.groupby(level=0).sum(),
+                test_split=self.config.forecast_model.test_split,
+            )
+            logger.info(f"Time-ordered split, testing on the rows after {date_cutoff:%Y-%m-%d}.")
+            columns = list(dict.fromkeys(columns + [n.F_X1_TRANSACTION_DATE]))
+
+        logger.info("Fitting the scaler on the training rows of each row group.")
+        scaler = StandardScaler()
+        for chunk in self.iter_feature_chunks(columns=columns):
+            is_train = ~self.get_chunk_test_mask(chunk=chunk, key_columns=key_columns, date_cutoff=date_cutoff)
+            if is_train.any():
+                scaler.partial_fit(to_matrix(df=chunk[is_train], columns=feature_names, dtype=dtype))
+
+        logger.info("Scaling row groups and writing train and test shards.")
+        shard_directory = self.out_of_core_config.shard_directory
+        shard_path = get_file_path(
+            pipeline_name=self.config.run_details.pipeline,
+            base_directory=self.output_data.base_directory,
+            time_connector=self.config.run_details.run_version,
+            file_name=shard_directory,
+        )
+        remove_path(shard_path)
+        shards = {"train": [], "test": []}
+        rows = {"train": 0, "test": 0}
+        for i, chunk in enumerate(self.iter_feature_chunks(columns=columns)):
+            is_test = self.get_chunk_test_mask(chunk=chunk, key_columns=key_columns, date_cutoff=date_cutoff)
+            for split, mask in (("train", ~is_test), ("test", is_test)):
+                if not mask.any():
+                    continue
+                X = scaler.transform(to_matrix(df=chunk[mask], columns=feature_names, dtype=dtype), copy=False)
+                # temporal features are missing without earlier rows, impute the training mean after scaling
+                X[:, temporal_positions] = np.nan_to_num(X[:, temporal_positions])
+                y = chunk.loc[mask, target].to_numpy(dtype=float, na_value=np.nan)
+                file_name = f"{split}-{i:05d}{ARRAY_BUNDLE_EXT}"
+                write_file(
+                    out_obj={"X": X, "y": y},
+                    pipeline_name=self.config.run_details.pipeline,
+                    base_directory=self.output_data.base_directory,
+                    time_connector=self.config.run_details.run_version,
+                    file_name=os.path.join(shard_directory, file_name),
+                )
+                shards[split].append(file_name)
+                rows[split] += len(y)
+        flush_pending_writes()  # shards are read back by the downstream tasks
+        logger.info(f"Wrote {rows['train']} train and {rows['test']} test rows to {shard_path}.")
+
+        return {
+            "shard_directory": shard_directory,  # relative to the output directory of the run
+            "shards": shards,
+            "rows": rows,
+            "feature_names": feature_names,
+            "target": target,
+            "dtype": dtype,
+            "scaler_mean": scaler.mean_.tolist(),
+            "scaler_scale": scaler.scale_.tolist(),
+        }
+
+    def iter_feature_chunks(self, columns: List[str]) -> Iterator[pd.DataFrame]:
+        """Columns of the feature data file, one parquet row group at a time."""
+        return read_file(
+            read_type="pandas_chunks",
+            chunksize=None,
+            columns=columns,
+            base_directory=self.input_data.base_directory,
+            pipeline_name=self.config.run_details.pipeline,
+            time_connector=self.config.run_details.run_version,
+            file_name=self.input_data.tables.feature_data,
+        )
+
     def select_training_features(
         self,
         df: pd.DataFrame,
@@ -107,8 +521,7 @@ class PrepareTrainingData(Task):
         categorical_features: List[str],
     ) -> pd.DataFrame:
         """Select the features to be used in the training data."""
-        # TODO : encode and concatenate categorical variables
-        selected_features = numeric_features  # + categorical_features
+        selected_features = list(dict.fromkeys(numeric_features + categorical_features))
         return df[selected_features].copy()
 
     def scale_numeric_features(
@@ -121,8 +534,8 @@ class PrepareTrainingData(Task):
         scaler = StandardScaler()
         X_train_scaled_arr = scaler.fit_transform(X_train[numeric_features])
         X_test_scaled_arr = scaler.transform(X=X_test[numeric_features])
-        X_train_scaled = pd.DataFrame(X_train_scaled_arr, columns=numeric_features)
-        X_test_scaled = pd.DataFrame(X_test_scaled_arr, columns=numeric_features)
+        X_train_scaled = pd.DataFrame(X_train_scaled_arr, columns=numeric_features, index=X_train.index)
+        X_test_scaled = pd.DataFrame(X_test_scaled_arr, columns=numeric_features, index=X_test.index)
         return X_train_scaled, X_test_scaled
 
     def format_train_data_output(
@@ -132,6 +545,7 @@ class PrepareTrainingData(Task):
         y_train: pd.DataFrame,
         y_test: pd.DataFrame,
         model_type: str,
+        feature_names: List[str] = None,
     ) -> Dict:
         """Populate output dictionary."""
         if model_type == "ml_model":
@@ -140,6 +554,7 @@ class PrepareTrainingData(Task):
                 "X_test": X_test,
                 "y_train": y_train,
                 "y_test": y_test,
+                "feature_names": feature_names,
             }
         elif model_type == "bayesian":
             return {}  # TODO!
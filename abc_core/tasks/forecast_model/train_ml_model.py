@@ -1,10 +1,12 @@
 import logging
 from typing import Dict, List, Tuple
+import numpy as np
 import pandas as pd
 
 from abc_core.tasks.base_task import Task
-from abc_core.utils.model_utils import get_model, tune_hyperparameters
-from abc_core.utils.read_write import read_file, write_file
+from abc_core.utils.model_utils import get_available_cores, get_model, tune_hyperparameters
+from abc_core.utils.out_of_core import load_split
+from abc_core.utils.read_write import get_file_path, get_parquet_options, read_file, write_file
 
 logger = logging.getLogger(__name__)
 
@@ -13,13 +15,20 @@ class TrainSklearnModel(Task):
     """Fit sklearn ml model to training data."""
 
     name = "train_ml_model"
+    inputs = ("train_data",)
+    outputs = ("model_fit",)
+    cacheable = True
+    config_keys = (
+        "forecast_model.features",
+        "forecast_model.ml_model",
+    )
 
     def __init__(
         self,
         config: Dict,
         **args,
     ):
-        self.config = config
+        super().__init__(config=config, **args)
         self.input_data = config.data.output_data
         self.output_data = config.data.output_data
 
@@ -32,9 +41,13 @@ class TrainSklearnModel(Task):
 
         return {"model_fit": fit}
 
-    def _load_inputs(self, **kwargs) -> pd.DataFrame:
+    def _load_inputs(self, **kwargs) -> Dict:
         """."""
-        logger.info("Loading feature data table.")
+        if "train_data" in self.upstream:
+            logger.info("Using training data dict from upstream task.")
+            return self.upstream["train_data"]
+
+        logger.info("Loading training data dict.")
         train_data = read_file(
             read_type="python_dict",
             base_directory=self.input_data.base_directory,
@@ -44,6 +57,33 @@ class TrainSklearnModel(Task):
         )
         return train_data
 
+    def input_artefacts(self) -> Dict[str, str]:
+        """."""
+        path = get_file_path(
+            base_directory=self.input_data.base_directory,
+            pipeline_name=self.config.run_details.pipeline,
+            time_connector=self.config.run_details.run_version,
+            file_name=self.input_data.dicts.train_data,
+        )
+        return {"train_data": path}
+
+    def output_artefacts(self) -> List[str]:
+        """."""
+        model_name = self.config.forecast_model.ml_model.model_name
+        if model_name == "lin_reg" or model_name == "log_reg":
+            params_file_name = self.output_data.tables.fit_params
+        else:  # black box models
+            params_file_name = self.output_data.tables.feature_importance
+        return [
+            get_file_path(
+                base_directory=self.output_data.base_directory,
+                pipeline_name=self.config.run_details.pipeline,
+                time_connector=self.config.run_details.run_version,
+                file_name=file_name,
+            )
+            for file_name in [self.output_data.models.ml_model, params_file_name]
+        ]
+
     def _save_results(self, fit_obj, params):
         """."""
         logger.info("Writing sklearn model fit object to file.")
@@ -62,6 +102,7 @@ class TrainSklearnModel(Task):
                 pipeline_name=self.config.run_details.pipeline,
                 time_connector=self.config.run_details.run_version,
                 file_name=self.output_data.tables.fit_params,
+                parquet_options=get_parquet_options(self.output_data, "fit_params"),
             )
         else:  # black box models
             write_file(
@@ -70,23 +111,39 @@ class TrainSklearnModel(Task):
                 pipeline_name=self.config.run_details.pipeline,
                 time_connector=self.config.run_details.run_version,
                 file_name=self.output_data.tables.feature_importance,
+                parquet_options=get_parquet_options(self.output_data, "feature_importance"),
             )
 
     def _train_model(self, data: pd.DataFrame):
         """Orchestration method."""
-        X_train, X_test = data["X_train"], data["X_test"]
-        y_train, y_test = data["y_train"], data["y_test"]
+        if "shards" in data:
+            n_bytes = data["rows"]["train"] * len(data["feature_names"]) * np.dtype(data["dtype"]).itemsize
+            logger.warning(
+                f"{self.config.forecast_model.ml_model.model_name} has no incremental fitting, loading all "
+                f"{data['rows']['train']} training rows of the shards into memory ({n_bytes / 2**30:.2f} GB). "
+                "Out of core only bounds the memory of preparing the training data."
+            )
+            shard_path = get_file_path(
+                base_directory=self.input_data.base_directory,
+                pipeline_name=self.config.run_details.pipeline,
+                time_connector=self.config.run_details.run_version,
+                file_name=data["shard_directory"],
+            )
+            X_train, y_train = load_split(manifest=data, shard_path=shard_path, split="train")
+        else:
+            X_train, y_train = data["X_train"], data["y_train"]
         model_name = self.config.forecast_model.ml_model.model_name
         
         logger.info(f"Hyperparameter tuning for {model_name} model.")
         best_params = self.find_best_hyperparameters(X_train=X_train, y_train=y_train)
 
         logger.info(f"Fit model with {best_params}.")
-        model_tuned = get_model(model_params=best_params, model_name=model_name)
+        model_tuned = get_model(model_params=best_params, model_name=model_name, n_threads=get_available_cores())
         model_tuned.fit(X_train, y_train)
 
         logger.info("Extract coefficients from model.")
-        params = self.extract_features_from_model(model=model_tuned)
+        feature_names = data.get("feature_names", list(getattr(X_train, "columns", [])))
+        params = self.extract_features_from_model(model=model_tuned, features=feature_names)
         
         return model_tuned, params
 
@@ -101,12 +158,9 @@ class TrainSklearnModel(Task):
             best_params, _ = tune_hyperparameters(X_train=X_train, y_train=y_train, model_config=model_config)
         return best_params
 
-    def extract_features_from_model(self, model) -> pd.DataFrame:
+    def extract_features_from_model(self, model, features: List[str]) -> pd.DataFrame:
         """Extract learned coefficients or feature importances from model."""
         model_name = self.config.forecast_model.ml_model.model_name
-        numeric_features = self.config.forecast_model.features.numeric
-        # categorical_features = self.config.forecast_model.features.categorical
-        features = numeric_features #+ categorical_features
         if model_name == "lin_reg" or model_name == "log_reg":
             values = model.coef_
         else: # black box models
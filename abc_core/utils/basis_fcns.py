@@ -1,54 +1,130 @@
-import math
-
-
-def scaled_normal_pdf(x, para_1, para_2):
-    """."""
-    # Note, max f(x)=1, no longer true for area under curve
-    mu = para_1
-    sigma = para_2
-    return math.exp(-pow((x - mu), 2) / (2 * pow(sigma, 2)))
-
-
-def linear(x, para_1, para_2=1):
-    """."""
-    gradient = para_1
-    y_int = para_2
-    return gradient * x + y_int
-
-
-def neg_linear(x, para_1, para_2=1):
-    """."""
-    gradient = para_1
-    y_int = para_2
-    return -gradient * x + y_int
-
-
-def parabola(x, para_1, para_2, para_3=1):
-    """."""
-    apex_y = para_1
-    apex_x = para_2
-    gradient = para_3
-    return gradient * (-apex_y / (apex_x**2)) * (x - apex_x) ** 2 + apex_y
-
-
-def logistic_curve(x, para_1, para_2):
-    """."""
-    # Note, extra parameter allows more freedom than exponential decay
-    growth_rate = para_1
-    sigmoid_midpoint = para_2
-    return 1 / (1 + math.exp(-growth_rate * (x - sigmoid_midpoint)))
-
-
-def diminishing_returns(x, para_1):
-    """."""
-    # Passes through center, asymptotes at f(x)=1
-    sensitivity = para_1
-    return 1 - math.exp(-sensitivity * x)
-
-
-def exponential_decay(x, para_1, para_2):
-    """."""
-    # Starts at 1 (height term), decays exponentially
-    translation = para_1
-    steepness = para_2
-    return 1 - math.exp(steepness * x - translation)
+from itertools import product
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from abc_core.utils.column_names import normalize_column_name
+
+# NOTE: functions are ufunc-style, x and parameters are scalars or arrays broadcast against each other
+
+
+def scaled_normal_pdf(x, para_1, para_2):
+    """."""
+    # Note, max f(x)=1, no longer true for area under curve
+    mu = para_1
+    sigma = para_2
+    return np.exp(-np.square(x - mu) / (2 * np.square(sigma)))
+
+
+def linear(x, para_1, para_2=1):
+    """."""
+    gradient = para_1
+    y_int = para_2
+    return gradient * x + y_int
+
+
+def neg_linear(x, para_1, para_2=1):
+    """."""
+    gradient = para_1
+    y_int = para_2
+    return -gradient * x + y_int
+
+
+def parabola(x, para_1, para_2, para_3=1):
+    """."""
+    apex_y = para_1
+    apex_x = para_2
+    gradient = para_3
+    return gradient * (-apex_y / np.square(apex_x)) * np.square(x - apex_x) + apex_y
+
+
+def logistic_curve(x, para_1, para_2):
+    """."""
+    # Note, extra parameter allows more freedom than exponential decay
+    growth_rate = para_1
+    sigmoid_midpoint = para_2
+    return 1 / (1 + np.exp(-growth_rate * (x - sigmoid_midpoint)))
+
+
+def diminishing_returns(x, para_1):
+    """."""
+    # Passes through center, asymptotes at f(x)=1
+    sensitivity = para_1
+    return 1 - np.exp(-sensitivity * x)
+
+
+def exponential_decay(x, para_1, para_2):
+    """."""
+    # Starts at 1 (height term), decays exponentially
+    translation = para_1
+    steepness = para_2
+    return 1 - np.exp(steepness * x - translation)
+
+
+BASIS_FCNS: Dict[str, Callable] = {
+    "scaled_normal_pdf": scaled_normal_pdf,
+    "linear": linear,
+    "neg_linear": neg_linear,
+    "parabola": parabola,
+    "logistic_curve": logistic_curve,
+    "diminishing_returns": diminishing_returns,
+    "exponential_decay": exponential_decay,
+}
+
+
+def get_parameter_grid(param_grid: Dict[str, List[float]]) -> Dict[str, np.ndarray]:
+    """Every combination of the parameter values, as one flat array per parameter."""
+    combinations = np.array(list(product(*param_grid.values())), dtype=float)
+    return {name: combinations[:, i] for i, name in enumerate(param_grid)}
+
+
+def format_parameter(value: float) -> str:
+    """Parameter value in a column name, e.g. -0.0005 as m0p0005 and 1e+06 as 1e06."""
+    return f"{value:g}".replace("-", "m").replace(".", "p").replace("+", "")
+
+
+def get_basis_names(col: str, fcn_name: str, param_grid: Dict[str, List[float]]) -> List[str]:
+    """Feature names of a column expanded through a basis function, in `expand_basis` column order.
+
+    Names are kept unchanged by `normalize_column_name`, so they match the columns read back from file.
+    """
+    names = [
+        "__".join([col, fcn_name] + [f"{name}={format_parameter(value)}" for name, value in zip(param_grid, values)])
+        for values in product(*param_grid.values())
+    ]
+    for name in names:
+        if normalize_column_name(name) != name:
+            raise ValueError(f"Basis feature name {name} is changed on read, rename the column or parameter.")
+    return names
+
+
+def expand_basis(x: np.ndarray, fcn_name: str, param_grid: Dict[str, List[float]]) -> np.ndarray:
+    """Apply a basis function for every parameter combination in one broadcasted call.
+
+    Returns an array of shape (len(x), number of parameter combinations).
+    """
+    grid = get_parameter_grid(param_grid)
+    return BASIS_FCNS[fcn_name](np.asarray(x, dtype=float)[:, None], **{k: v[None, :] for k, v in grid.items()})
+
+
+def get_basis_expansion_names(columns: List[str], functions: Dict[str, Dict[str, List[float]]]) -> List[str]:
+    """Feature names of every column expanded through every configured basis function."""
+    return [
+        name
+        for col in columns
+        for fcn_name, param_grid in functions.items()
+        for name in get_basis_names(col=col, fcn_name=fcn_name, param_grid=param_grid)
+    ]
+
+
+def expand_columns(
+    arrays: Dict[str, np.ndarray],
+    functions: Dict[str, Dict[str, List[float]]],
+) -> Tuple[np.ndarray, List[str]]:
+    """Expand each column array through every configured basis function into one feature matrix."""
+    blocks = [
+        expand_basis(x=x, fcn_name=fcn_name, param_grid=param_grid)
+        for x in arrays.values()
+        for fcn_name, param_grid in functions.items()
+    ]
+    return np.hstack(blocks), get_basis_expansion_names(columns=list(arrays), functions=functions)
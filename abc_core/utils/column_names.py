@@ -0,0 +1,26 @@
+from typing import Any
+
+from unidecode import unidecode
+
+# replacements applied to column names on read, after removing accents and before lower-casing
+COLUMN_NAME_REPLACEMENTS = [
+    ("\n", " "),
+    ("-", " "),
+    (".", ""),
+    (",", " "),
+    (")", ""),
+    ("(", ""),
+    ("+", ""),
+    (" ", "_"),
+    ("/", "_"),
+    (":", ""),
+    ("#", "Number"),
+]
+
+
+def normalize_column_name(col: Any) -> str:
+    """Remove accents and special characters from column name."""
+    col = unidecode(str(col))
+    for old, new in COLUMN_NAME_REPLACEMENTS:
+        col = col.replace(old, new)
+    return col.lower()
@@ -0,0 +1,149 @@
+import hashlib
+import logging
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.model_selection import KFold
+
+logger = logging.getLogger(__name__)
+
+ENCODING_METHODS = ("one_hot", "hashing", "frequency", "target")
+# methods encoding into a scipy CSR block, the others into one dense numeric column per categorical column
+SPARSE_METHODS = ("one_hot", "hashing")
+
+
+def mix_hashes(hashes: np.ndarray, salt: int) -> np.ndarray:
+    """Salt uint64 hashes and scramble their bits with the splitmix64 finalizer."""
+    z = hashes ^ np.uint64(salt)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def get_column_salt(col: str) -> int:
+    """Stable per column salt, so equal values of different columns hash to different buckets."""
+    return int.from_bytes(hashlib.sha256(col.encode()).digest()[:8], "little")
+
+
+class CategoricalEncoder:
+    """Encoder of categorical columns, fitted on the training split and saved with the run outputs.
+
+    `one_hot` and `hashing` encode into a CSR matrix with one non-zero per row and column, so
+    high-cardinality columns are never densified; hashing has a fixed width of `n_features` with
+    alternating signs. `frequency` and `target` map each column to one dense column from the
+    category maps fitted on the training split: the category share of the training rows, and the
+    category target mean smoothed towards the training mean. Missing and unseen categories have no
+    one-hot entry, a frequency of 0 and the training target mean. Training rows are target encoded
+    out of fold by `fit_transform`, so their own target never enters their encoding.
+    """
+
+    def __init__(
+        self,
+        columns: List[str],
+        method: str = "one_hot",
+        n_features: int = 1024,
+        smoothing: float = 10.0,
+        n_folds: int = 5,
+        random_state: int = None,
+    ):
+        if method not in ENCODING_METHODS:
+            raise ValueError(f"Categorical encoding {method} not supported, choose from {ENCODING_METHODS}.")
+        self.columns = list(columns)
+        self.method = method
+        self.n_features = n_features
+        self.smoothing = smoothing
+        self.n_folds = n_folds
+        self.random_state = random_state
+        self.maps: Dict[str, pd.Series] = {}
+        self.default = 0.0
+
+    @property
+    def is_sparse(self) -> bool:
+        return self.method in SPARSE_METHODS
+
+    def fit(self, df: pd.DataFrame, y: pd.Series = None) -> "CategoricalEncoder":
+        """Fit the category maps of each column on the training rows."""
+        if self.method == "target":
+            y = pd.Series(np.asarray(y, dtype=float))
+            self.default = float(y.mean())
+        for col in self.columns:
+            values = pd.Series(df[col].to_numpy())
+            if self.method == "one_hot":
+                categories = pd.Index(values.dropna().unique()).sort_values()
+                self.maps[col] = pd.Series(np.arange(len(categories)), index=categories)
+            elif self.method == "frequency":
+                self.maps[col] = values.value_counts(normalize=True, dropna=True)
+            elif self.method == "target":
+                stats = y.groupby(values, dropna=True).agg(["sum", "count"])
+                smoothed = (stats["sum"] + self.default * self.smoothing) / (stats["count"] + self.smoothing)
+                self.maps[col] = smoothed
+        return self
+
+    def fit_transform(
+        self,
+        df: pd.DataFrame,
+        y: pd.Series = None,
+        dtype: str = "float64",
+    ) -> sparse.csr_matrix | np.ndarray:
+        """Fit on the training rows and encode them, see `transform`.
+
+        With target encoding, the rows of each of `n_folds` folds are encoded with the category maps
+        fitted on the other folds. The maps fitted on all training rows encode the test and new rows.
+        """
+        self.fit(df=df, y=y)
+        if self.method != "target" or min(self.n_folds, len(df)) < 2:
+            return self.transform(df, dtype=dtype)
+        y = np.asarray(y, dtype=float)
+        encoded = np.empty((len(df), len(self.columns)), dtype=dtype)
+        folds = KFold(n_splits=min(self.n_folds, len(df)), shuffle=True, random_state=self.random_state)
+        for fit_positions, encode_positions in folds.split(encoded):
+            fold_encoder = CategoricalEncoder(columns=self.columns, method=self.method, smoothing=self.smoothing)
+            fold_encoder.fit(df=df.iloc[fit_positions], y=y[fit_positions])
+            encoded[encode_positions] = fold_encoder.transform(df.iloc[encode_positions], dtype=dtype)
+        return encoded
+
+    def get_feature_names(self) -> List[str]:
+        """Names of the encoded columns, in `transform` column order."""
+        if self.method == "one_hot":
+            return [f"{col}={category}" for col in self.columns for category in self.maps[col].index]
+        if self.method == "hashing":
+            return [f"categorical_hash_{i}" for i in range(self.n_features)]
+        return [f"{col}__{self.method}" for col in self.columns]
+
+    def transform(self, df: pd.DataFrame, dtype: str = "float64") -> sparse.csr_matrix | np.ndarray:
+        """Encode the columns of df, as a CSR matrix for sparse methods and a dense matrix otherwise."""
+        if self.is_sparse:
+            return self._transform_sparse(df, dtype=dtype)
+        encoded = np.empty((len(df), len(self.columns)), dtype=dtype)
+        for j, col in enumerate(self.columns):
+            codes = self.maps[col].index.get_indexer(df[col].to_numpy())
+            encoded[:, j] = np.where(codes >= 0, self.maps[col].to_numpy(dtype=float)[codes], self.default)
+        return encoded
+
+    def _transform_sparse(self, df: pd.DataFrame, dtype: str) -> sparse.csr_matrix:
+        rows, cols, data = [], [], []
+        offset = 0
+        for col in self.columns:
+            values = df[col]
+            is_valid = values.notna().to_numpy()
+            if self.method == "one_hot":
+                codes = self.maps[col].index.get_indexer(values.to_numpy())
+                is_valid &= codes >= 0
+                cols.append(codes[is_valid] + offset)
+                data.append(np.ones(is_valid.sum(), dtype=dtype))
+                offset += len(self.maps[col])
+            else:
+                hashes = mix_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy(), get_column_salt(col))
+                hashes = hashes[is_valid]
+                cols.append((hashes % np.uint64(self.n_features)).astype(np.int64))
+                # the top bit gives the sign, so colliding categories cancel out on average
+                data.append(np.where(hashes >> np.uint64(63), -1.0, 1.0).astype(dtype))
+            rows.append(np.flatnonzero(is_valid))
+        width = offset if self.method == "one_hot" else self.n_features
+        return sparse.csr_matrix(
+            (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(len(df), width),
+            dtype=dtype,
+        )
@@ -0,0 +1,133 @@
+import logging
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from abc_core.constant import name as n
+from abc_core.utils.basis_fcns import expand_columns
+from abc_core.utils.shared_arrays import SharedArrays, SharedArraySpec, get_shared_array
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371  # have r = 3956 if you want miles
+MIN_CHUNK_ROWS = 100_000  # rows per process pool task, smaller tables are computed in process
+
+
+def haversine_distance(lat: np.ndarray, lng: np.ndarray, degrees: bool = True) -> np.ndarray:
+    """
+    'Single-point' Haversine: Calculates the great circle distance
+    between each point on Earth and the (0, 0) lat-long coordinate
+    """
+    # Convert decimal degrees to radians
+    if degrees:
+        lat, lng = np.radians(lat), np.radians(lng)
+
+    # 'Single-point' Haversine formula
+    a = np.sin(lat / 2) ** 2 + np.cos(lat) * np.sin(lng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+# build a registry of vectorized feature functions: {feature name: (function, input columns)}.
+# NOTE: add new feature variables here! functions receive one float numpy array per input column.
+# functions must be element-wise and defined at module level, so they run on row chunks in worker processes.
+FEATURE_REGISTRY: Dict[str, Tuple[Callable, List[str]]] = {
+    n.F_X7_HAVERSINE_DISTANCE: (haversine_distance, [n.F_X5_LATITUDE, n.F_X6_LONGITUDE]),
+}
+
+
+def get_input_array(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Extract column as float numpy array, mapping nullable missing values to NaN."""
+    return df[col].to_numpy(dtype=float, na_value=np.nan)
+
+
+def compute_features(
+    df: pd.DataFrame,
+    registry: Dict[str, Tuple[Callable, List[str]]] = FEATURE_REGISTRY,
+    max_workers: int = 1,
+) -> pd.DataFrame:
+    """Add every registered feature to df as a column-wise array operation.
+
+    With max_workers > 1, features and row chunks of large tables are computed on a process pool.
+    """
+    arrays = {}
+    for feature, (_, input_cols) in registry.items():
+        logger.info(f"Adding feature: {feature} from {input_cols}.")
+        for col in input_cols:
+            if col not in arrays:
+                arrays[col] = get_input_array(df=df, col=col)
+
+    max_workers = max_workers or 1
+    n_chunks = max(min(max_workers, len(df) // MIN_CHUNK_ROWS), 1)
+    if max_workers > 1 and n_chunks * len(registry) > 1:
+        features = compute_features_in_processes(
+            arrays=arrays, registry=registry, n_rows=len(df), n_chunks=n_chunks, max_workers=max_workers
+        )
+    else:
+        features = {feature: fcn(*[arrays[col] for col in cols]) for feature, (fcn, cols) in registry.items()}
+
+    for feature, values in features.items():
+        df[feature] = values
+    return df
+
+
+def compute_features_in_processes(
+    arrays: Dict[str, np.ndarray],
+    registry: Dict[str, Tuple[Callable, List[str]]],
+    n_rows: int,
+    n_chunks: int,
+    max_workers: int,
+) -> Dict[str, np.ndarray]:
+    """Compute every feature over every row chunk as a separate process pool task.
+
+    Input columns and the feature matrix live in shared memory, workers read and write them in place.
+    """
+    chunk_rows = math.ceil(n_rows / n_chunks)
+    logger.info(f"Computing {len(registry)} features over {n_chunks} row chunks on {max_workers} processes.")
+    with SharedArrays() as shared:
+        input_specs = {col: shared.put(values) for col, values in arrays.items()}
+        output_spec = shared.allocate(shape=(len(registry), n_rows))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    compute_feature_chunk,
+                    fcn=fcn,
+                    input_specs=[input_specs[col] for col in input_cols],
+                    output_spec=output_spec,
+                    row=row,
+                    start=start,
+                    stop=min(start + chunk_rows, n_rows),
+                )
+                for row, (fcn, input_cols) in enumerate(registry.values())
+                for start in range(0, n_rows, chunk_rows)
+            ]
+            for future in futures:
+                future.result()
+        return dict(zip(registry, shared.read(output_spec)))
+
+
+def compute_feature_chunk(
+    fcn: Callable,
+    input_specs: List[SharedArraySpec],
+    output_spec: SharedArraySpec,
+    row: int,
+    start: int,
+    stop: int,
+) -> None:
+    """Process pool task: write one feature of the rows [start, stop) into the shared feature matrix."""
+    inputs = [get_shared_array(spec)[start:stop] for spec in input_specs]
+    get_shared_array(output_spec)[row, start:stop] = fcn(*inputs)
+
+
+def compute_basis_features(
+    df: pd.DataFrame,
+    columns: List[str],
+    functions: Dict[str, Dict[str, List[float]]],
+) -> pd.DataFrame:
+    """Add the basis expansions of columns, see `utils/basis_fcns.py`, as one block of feature columns."""
+    arrays = {col: get_input_array(df=df, col=col) for col in columns}
+    values, names = expand_columns(arrays=arrays, functions=functions)
+    logger.info(f"Adding {len(names)} basis expansion features of {columns}.")
+    return pd.concat([df, pd.DataFrame(values, columns=names, index=df.index)], axis=1)
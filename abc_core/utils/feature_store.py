@@ -0,0 +1,104 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from abc_core.utils.read_write import remove_path, write_file
+
+logger = logging.getLogger(__name__)
+
+ROW_HASH = "row_hash"
+
+
+def get_feature_fingerprint(definition: Dict, source_files: List[str]) -> str:
+    """Hash a feature definition, e.g. feature names and parameters, and the source code computing it."""
+    digest = hashlib.sha256(json.dumps(definition, sort_keys=True, default=str).encode())
+    for source_file in source_files:
+        with open(source_file, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def get_row_hashes(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """Hash the values of the input columns of each row to uint64."""
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+class FeatureStore:
+    """Row-wise feature values of each processed data version, keyed by a hash of their input columns.
+
+    Snapshots are saved as `<base_directory>/<processed_data_version>/<fingerprint>.parquet`, the
+    fingerprint identifying the feature definition. A new version only computes the features of
+    rows whose inputs are not found in the latest snapshot of the same fingerprint.
+    """
+
+    def __init__(self, config: Dict):
+        self.base_directory = config.base_directory
+        self.max_versions = config.get("max_versions", 3)
+
+    def _get_snapshot_paths(self, fingerprint: str) -> List[str]:
+        """Snapshots of a feature definition, most recent first."""
+        paths = glob.glob(os.path.join(self.base_directory, "*", f"{fingerprint}.parquet"))
+        return sorted(paths, key=os.path.getmtime, reverse=True)
+
+    def load(self, fingerprint: str, feature_columns: List[str]) -> Optional[pd.DataFrame]:
+        """Latest snapshot of a feature definition indexed by row hash, None if there is none.
+
+        Column names are read as written, without `normalize_column_name`. A snapshot missing any of
+        the feature columns is ignored, so the features of all rows are recomputed.
+        """
+        paths = self._get_snapshot_paths(fingerprint)
+        if not paths:
+            return None
+        snapshot = pd.read_parquet(paths[0])
+        missing = [col for col in feature_columns if col not in snapshot.columns]
+        if missing:
+            logger.warning(f"Feature store snapshot {paths[0]} is missing columns {missing}, recomputing all rows.")
+            return None
+        return snapshot.set_index(ROW_HASH)[feature_columns]
+
+    def save(self, fingerprint: str, version: str, features: pd.DataFrame) -> None:
+        """Save the features indexed by row hash as the snapshot of a version, keep the latest `max_versions`."""
+        for path in self._get_snapshot_paths(fingerprint)[max(self.max_versions - 1, 0) :]:
+            if os.path.dirname(path) != os.path.join(self.base_directory, version):
+                remove_path(path)
+        snapshot = features[~features.index.duplicated()].rename_axis(ROW_HASH).reset_index()
+        write_file(
+            out_obj=snapshot,
+            base_directory=self.base_directory,
+            time_connector=version,
+            file_name=f"{fingerprint}.parquet",
+        )
+
+    def compute(
+        self,
+        df: pd.DataFrame,
+        compute_fcn: Callable[[pd.DataFrame], pd.DataFrame],
+        input_columns: List[str],
+        feature_columns: List[str],
+        fingerprint: str,
+        version: str,
+    ) -> pd.DataFrame:
+        """Add the numeric feature columns to df, only computing them for rows missing from the latest snapshot.
+
+        compute_fcn adds the feature columns to a frame and must be row-wise, i.e. only depend on
+        the input columns of each row.
+        """
+        row_hashes = get_row_hashes(df=df, columns=input_columns)
+        stored = self.load(fingerprint, feature_columns=feature_columns)
+        is_new = np.ones(len(df), dtype=bool) if stored is None else ~np.isin(row_hashes, stored.index.to_numpy())
+        logger.info(f"Feature store: computing features of {is_new.sum()} new of {len(df)} rows.")
+
+        values = np.empty((len(df), len(feature_columns)))
+        if is_new.any():
+            values[is_new] = compute_fcn(df.loc[is_new].copy())[feature_columns].to_numpy(dtype=float)
+        if not is_new.all():
+            values[~is_new] = stored.loc[row_hashes[~is_new], feature_columns].to_numpy(dtype=float)
+
+        self.save(fingerprint=fingerprint, version=version, features=pd.DataFrame(values, row_hashes, feature_columns))
+        return pd.concat([df, pd.DataFrame(values, index=df.index, columns=feature_columns)], axis=1)
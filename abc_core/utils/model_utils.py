@@ -1,17 +1,25 @@
 import logging
+import os
+from typing import Tuple
+
 import pandas as pd
 
 from xgboost import XGBRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import RandomizedSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV, RandomizedSearchCV
 from sklearn.model_selection import KFold
 
 logger = logging.getLogger(__name__)
 
 
-def get_model(model_name: str, model_params: dict = None):
-    """Get base model for machine learning forecast."""
+# models whose fits run on `n_jobs` threads
+THREADED_MODELS = ("random_forest", "xgboost")
+
+
+def get_model(model_name: str, model_params: dict = None, n_threads: int = None):
+    """Get base model for machine learning forecast, fitting on n_threads threads if threaded."""
     if model_name == "lin_reg":
         if model_params is None:
             model = LinearRegression()
@@ -32,28 +40,81 @@ def get_model(model_name: str, model_params: dict = None):
             f"ABC only supports \
             random_forest and xgboost, got {model_name}."
         )
+    if n_threads is not None and model_name in THREADED_MODELS:
+        model.set_params(n_jobs=n_threads)
     return model
 
 
+def get_available_cores() -> int:
+    """Number of cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_thread_budget(n_jobs: int = 1) -> Tuple[int, int]:
+    """Split the available cores into parallel search fits and threads per model fit.
+
+    n_jobs is the number of parallel fits, -1 for one per core. Their product never exceeds the
+    available cores, so threaded models do not oversubscribe them.
+    """
+    cores = get_available_cores()
+    n_workers = cores if n_jobs is None or n_jobs < 0 else max(min(n_jobs, cores), 1)
+    return n_workers, max(cores // n_workers, 1)
+
+
 def tune_hyperparameters(
     X_train: pd.DataFrame,
     y_train: pd.DataFrame,
     model_config: dict,
 ):
-    """Tune hyperparameters for sklearn models."""
+    """Tune hyperparameters for sklearn models.
+
+    `hyperparameters.search` selects a randomized search over n_iter candidates, or a successive
+    halving search which fits all candidates on a small resource budget, e.g. few samples or
+    estimators, and only keeps the best 1 / factor of them for each larger budget.
+    """
     hp_tuning_config = model_config.hyperparameters
     model_name = model_config.model_name
-    model = get_model(model_name=model_name)
+    n_workers, n_threads = get_thread_budget(hp_tuning_config.get("n_jobs", 1))
+    model = get_model(model_name=model_name, n_threads=n_threads)
     cv = KFold(n_splits=hp_tuning_config.cv_splits)
-    gs = RandomizedSearchCV(
-        estimator=model,
-        scoring=model_config.scoring,
-        param_distributions=hp_tuning_config[model_name],
-        n_iter=hp_tuning_config.n_iter,
-        cv=cv,
-        return_train_score=True,
-        # random_state=model_config.random_state,
-    )
+    param_distributions = dict(hp_tuning_config[model_name])
+    search = hp_tuning_config.get("search", "random")
+    logger.info(f"Hyperparameter search: {search}, {n_workers} parallel fits of {n_threads} threads each.")
+    if search == "random":
+        gs = RandomizedSearchCV(
+            estimator=model,
+            scoring=model_config.scoring,
+            param_distributions=param_distributions,
+            n_iter=hp_tuning_config.n_iter,
+            cv=cv,
+            n_jobs=n_workers,
+            return_train_score=True,
+            # random_state=model_config.random_state,
+        )
+    elif search == "halving":
+        halving_config = hp_tuning_config.get("halving", {})
+        resource = halving_config.get("resource", "n_samples")
+        max_resources = "auto"
+        if resource != "n_samples":
+            # the resource is a model parameter, searched up to the largest configured value
+            max_resources = max(param_distributions.pop(resource))
+        gs = HalvingRandomSearchCV(
+            estimator=model,
+            scoring=model_config.scoring,
+            param_distributions=param_distributions,
+            n_candidates=halving_config.get("n_candidates", 27),
+            factor=halving_config.get("factor", 3),
+            resource=resource,
+            min_resources=halving_config.get("min_resources", "exhaust"),
+            max_resources=max_resources,
+            cv=cv,
+            n_jobs=n_workers,
+            return_train_score=True,
+        )
+    else:
+        raise ValueError(f"Hyperparameter search {search} not supported, choose from 'random', 'halving'.")
     gs.fit(X_train, y_train)
     best_params = gs.best_params_
     best_score = gs.best_score_
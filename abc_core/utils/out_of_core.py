@@ -0,0 +1,64 @@
+import logging
+import os
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from abc_core.utils.read_write import read_array_bundle
+
+logger = logging.getLogger(__name__)
+
+SPLIT_BUCKETS = 10_000  # resolution of the test split fraction
+
+
+def get_test_mask(df: pd.DataFrame, key_columns: List[str], test_split: float) -> np.ndarray:
+    """Assign rows to the test split from a hash of their key, independent of row order and chunking."""
+    hashes = pd.util.hash_pandas_object(df[key_columns], index=False).to_numpy()
+    return hashes % SPLIT_BUCKETS < round(test_split * SPLIT_BUCKETS)
+
+
+def to_matrix(df: pd.DataFrame, columns: List[str], dtype: str = "float32") -> np.ndarray:
+    """Fill a C-contiguous matrix column by column, missing values as NaN."""
+    matrix = np.empty((len(df), len(columns)), dtype=dtype)
+    for j, col in enumerate(columns):
+        matrix[:, j] = df[col].to_numpy(dtype=float, na_value=np.nan)
+    return matrix
+
+
+def iter_shards(
+    manifest: Dict,
+    shard_path: str,
+    split: str,
+    mmap_mode: str = "r",
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Memory-mapped (X, y) of each shard of a split, see `PrepareTrainingData.prepare_out_of_core`.
+
+    shard_path is the `shard_directory` of the manifest resolved in the output directory of the
+    current run, as the manifest may be restored from the task cache of another run.
+    """
+    for file_name in manifest["shards"][split]:
+        shard = read_array_bundle(os.path.join(shard_path, file_name), mmap_mode=mmap_mode)
+        yield shard["X"], shard["y"]
+
+
+def load_split(manifest: Dict, shard_path: str, split: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenate the shards of a split in memory, for models without incremental fitting.
+
+    The whole split is materialised, so memory is no longer bounded by the row group size.
+    """
+    n_features = len(manifest["feature_names"])
+    shards = list(iter_shards(manifest, shard_path=shard_path, split=split))
+    if not shards:
+        return np.empty((0, n_features), dtype=manifest["dtype"]), np.empty(0)
+    X, y = zip(*shards)
+    return np.concatenate(X), np.concatenate(y)
+
+
+def predict_shards(model, manifest: Dict, shard_path: str, split: str) -> pd.DataFrame:
+    """Targets and predictions of a split, predicted one shard at a time."""
+    preds = [
+        pd.DataFrame({"y_true": y, "y_pred": model.predict(X)})
+        for X, y in iter_shards(manifest, shard_path=shard_path, split=split)
+    ]
+    return pd.concat(preds, ignore_index=True) if preds else pd.DataFrame(columns=["y_true", "y_pred"])
@@ -1,19 +1,50 @@
 import json
 import logging
+import operator
 import os
 import pickle
-from typing import Any, Dict
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
 
 import arviz as az
+import fastparquet
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from box import Box
 from matplotlib.figure import Figure
-from unidecode import unidecode
+from scipy import sparse
 
+from abc_core.constant import name as n
 from abc_core.schema.base_schema import BaseSchema
+from abc_core.utils.column_names import normalize_column_name
+from abc_core.utils.write_behind import WRITE_BEHIND
 
 logger = logging.getLogger(__name__)
 
+# operators of (column, operator, value) filters, as supported by the parquet readers
+FILTER_OPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda col, value: col.isin(value),
+    "not in": lambda col, value: ~col.isin(value),
+}
+
+# directory of one .npy file per array and a json metadata file, see `save_array_bundle`
+ARRAY_BUNDLE_EXT = ".arrays"
+ARRAY_BUNDLE_METADATA = "metadata.json"
+
+# operators of year_month partition filters implied by filters on the partitioning date column
+PARTITION_OPERATORS = {">": ">=", ">=": ">=", "<": "<=", "<=": "<=", "=": "=", "==": "="}
+
 
 def read_file(
     base_directory: str,
@@ -25,6 +56,7 @@ def read_file(
     """Handler to call correct read function given input read_type arg."""
     function_map = {
         "pandas_df": read_file_as_df,
+        "pandas_chunks": read_file_as_chunks,
         "python_dict": read_file_as_dict,
         "arviz_idata": read_file_as_arviz,
         "sklearn_model": read_file_as_model,
@@ -44,9 +76,33 @@ def read_file(
         raise ("Read type argument not supported.")
 
 
+def read_files(table_specs: Dict[str, Dict], max_workers: int = None) -> Dict[str, Any]:
+    """Read several tables concurrently on a bounded thread pool.
+
+    `table_specs` maps table names to `read_file` arguments, e.g. base_directory,
+    time_connector, file_name and schema. Returns the loaded tables by name.
+    """
+    max_workers = max_workers or min(len(table_specs), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        futures = {name: executor.submit(read_file, **spec) for name, spec in table_specs.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def get_file_path(
+    base_directory: str,
+    time_connector: str,
+    file_name: str,
+    pipeline_name: str = None,
+) -> str:
+    """Build the path to a versioned file, as used by the read and write handlers."""
+    if pipeline_name:
+        base_directory = os.path.join(base_directory, pipeline_name)
+    return os.path.join(base_directory, time_connector, file_name)
+
+
 def read_file_as_yaml(base_directory: str, time_connector: str, file_name: str) -> dict:
     """Load data from yaml file."""
-    path_to_load = os.path.join(base_directory, time_connector, file_name)
+    path_to_load = get_file_path(base_directory=base_directory, time_connector=time_connector, file_name=file_name)
     yaml_box = Box.from_yaml(filename=path_to_load)
     return yaml_box
 
@@ -62,11 +118,27 @@ def read_file_as_df(
     separator: str = None,
     schema: BaseSchema = None,
     skipcols: list = [],
+    csv_engine: str = "python",
+    column_mapping: Dict[str, str] = None,
+    columns: List[str] = None,
+    filters: List = None,
+    partition_on: str = None,
 ) -> pd.DataFrame:
-    """Load data in pandas DataFrame format."""
-    if pipeline_name:
-        base_directory = os.path.join(base_directory, pipeline_name)
-    path_to_load = os.path.join(base_directory, time_connector, file_name)
+    """Load data in pandas DataFrame format.
+
+    `column_mapping` maps normalized raw column names to schema column names, for raw
+    files whose columns are only renamed to the schema by the processing task.
+    `columns` (defaulting to the schema columns) and `filters`, a list of (column, operator,
+    value) tuples or a list of such lists combined with OR, are pushed into the parquet reader.
+    Datasets written with `partition_on` only read the year_month partitions matching filters
+    on that date column.
+    """
+    path_to_load = get_file_path(
+        base_directory=base_directory,
+        time_connector=time_connector,
+        file_name=file_name,
+        pipeline_name=pipeline_name,
+    )
     if file_name.endswith(".json"):
         df = pd.read_json(path_to_load)
     elif file_name.endswith(".xlsx") or file_name.endswith(".xls"):
@@ -92,35 +164,202 @@ def read_file_as_df(
                     usecols=lambda x: x not in skipcols,
                 )
     elif file_name.endswith(".parquet"):
-        df = pd.read_parquet(path_to_load)
+        if columns is None and schema and not column_mapping:
+            columns = schema.get_column_names()
+        read_columns = None if columns is None else list(dict.fromkeys(columns + get_filter_columns(filters)))
+        read_filters = filters
+        if partition_on and filters and os.path.isdir(path_to_load):
+            read_filters = add_partition_filters(filters=filters, partition_on=partition_on)
+        df = pd.read_parquet(path_to_load, columns=read_columns, filters=read_filters or None)
+        df = df.drop(columns=n.F_YEAR_MONTH, errors="ignore")
     elif file_name.endswith(".txt") or file_name.endswith(".csv"):
-        df = pd.read_csv(path_to_load, sep=separator, engine='python')
+        df = read_csv(
+            path_to_load=path_to_load,
+            separator=separator,
+            csv_engine=csv_engine,
+            schema=schema,
+            column_mapping=column_mapping,
+        )
     elif file_name.endswith(".pickle"):
         df = pd.read_pickle(path_to_load)
     else:
         raise ValueError("Table format not supported")
 
     if isinstance(df, pd.DataFrame):
-        df.columns = [
-            unidecode(str(col)) for col in df.columns
-        ]  # Remove accents from column names
-        df.columns = df.columns.str.replace("\n", " ", regex=False).str.lower()
-        df.columns = df.columns.str.replace("-", " ", regex=False).str.lower()
-        df.columns = df.columns.str.replace(".", "", regex=False).str.lower()
-        df.columns = df.columns.str.replace(",", " ", regex=False).str.lower()
-        df.columns = df.columns.str.replace(")", "", regex=False).str.lower()
-        df.columns = df.columns.str.replace("(", "", regex=False).str.lower()
-        df.columns = df.columns.str.replace("+", "", regex=False).str.lower()
-        df.columns = df.columns.str.replace(" ", "_", regex=False).str.lower()
-        df.columns = df.columns.str.replace("/", "_", regex=False).str.lower()
-        df.columns = df.columns.str.replace(":", "", regex=False).str.lower()
-        df.columns = df.columns.str.replace("#", "Number", regex=False).str.lower()
-        if schema:
-            df = df[schema.get_column_names()]
-            df = schema.cast(df)
+        # row level filtering, the fastparquet engine only skips row groups
+        df = apply_filters(df=df, filters=filters)
+        if columns is not None:
+            df = df[columns]
+        df = format_df_columns(df=df, schema=schema, column_mapping=column_mapping)
     return df
 
 
+def get_filter_columns(filters: List = None) -> List[str]:
+    """List columns used by read filters."""
+    if not filters:
+        return []
+    conjunctions = filters if isinstance(filters[0], list) else [filters]
+    return list(dict.fromkeys(col for conjunction in conjunctions for col, _, _ in conjunction))
+
+
+def apply_filters(df: pd.DataFrame, filters: List = None) -> pd.DataFrame:
+    """Keep rows matching read filters, in disjunctive normal form as for parquet readers."""
+    if not filters:
+        return df
+    conjunctions = filters if isinstance(filters[0], list) else [filters]
+    mask = np.zeros(len(df), dtype=bool)
+    for conjunction in conjunctions:
+        conjunction_mask = np.ones(len(df), dtype=bool)
+        for col, op, value in conjunction:
+            conjunction_mask &= FILTER_OPERATORS[op](df[col], value).to_numpy(dtype=bool, na_value=False)
+        mask |= conjunction_mask
+    return df[mask].reset_index(drop=True)
+
+
+def get_year_month(date: Any) -> int:
+    """Encode the year and month of a date as yyyymm."""
+    date = pd.Timestamp(date)
+    return date.year * 100 + date.month
+
+
+def add_partition_filters(filters: List, partition_on: str) -> List:
+    """Add the year_month partition filters implied by filters on the partitioning date column."""
+    conjunctions = filters if isinstance(filters[0], list) else [filters]
+    pruned = []
+    for conjunction in conjunctions:
+        partition_filters = [
+            (n.F_YEAR_MONTH, PARTITION_OPERATORS[op], get_year_month(value))
+            for col, op, value in conjunction
+            if col == partition_on and op in PARTITION_OPERATORS
+        ]
+        pruned.append(list(conjunction) + partition_filters)
+    return pruned if isinstance(filters[0], list) else pruned[0]
+
+
+def get_date_range_filters(col: str, start: str = None, end: str = None) -> List[Tuple[str, str, Any]]:
+    """Build read filters selecting an inclusive date range, None bounds are open."""
+    filters = []
+    if start is not None:
+        filters.append((col, ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append((col, "<=", pd.Timestamp(end)))
+    return filters
+
+
+def read_file_as_chunks(
+    base_directory: str,
+    time_connector: str,
+    file_name: str,
+    chunksize: int,
+    pipeline_name: str = None,
+    separator: str = None,
+    schema: BaseSchema = None,
+    csv_engine: str = "python",
+    column_mapping: Dict[str, str] = None,
+    columns: List[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """Load data as an iterator of pandas DataFrame chunks, see `read_file_as_df`.
+
+    Parquet files are read one row group at a time, `chunksize` is ignored.
+    """
+    path_to_load = get_file_path(
+        base_directory=base_directory,
+        time_connector=time_connector,
+        file_name=file_name,
+        pipeline_name=pipeline_name,
+    )
+    if file_name.endswith(".txt") or file_name.endswith(".csv"):
+        chunks = read_csv(
+            path_to_load=path_to_load,
+            separator=separator,
+            csv_engine="c" if csv_engine == "pyarrow" else csv_engine,  # no chunking in arrow parser
+            schema=schema,
+            column_mapping=column_mapping,
+            chunksize=chunksize,
+        )
+    elif file_name.endswith(".parquet"):
+        chunks = (df for df in fastparquet.ParquetFile(path_to_load).iter_row_groups(columns=columns))
+    else:
+        raise ValueError("Table format not supported for chunked reading")
+
+    for df in chunks:
+        df = format_df_columns(df=df, schema=schema, column_mapping=column_mapping)
+        yield df if columns is None else df[columns]
+
+
+def format_df_columns(
+    df: pd.DataFrame,
+    schema: BaseSchema = None,
+    column_mapping: Dict[str, str] = None,
+) -> pd.DataFrame:
+    """Normalize column names, then select and cast schema columns."""
+    df.columns = [normalize_column_name(col) for col in df.columns]
+    if schema and column_mapping:
+        # raw column names are kept, renaming and casting is left to the processing task
+        schema_dtypes = schema.get_metadata().dtypes
+        df = df[[col for col in df.columns if column_mapping.get(col, col) in schema_dtypes]]
+    elif schema:
+        df = df[schema.get_column_names()]
+        df = schema.cast(df)
+    return df
+
+
+def get_schema_read_options(
+    raw_columns: List[str],
+    schema: BaseSchema,
+    column_mapping: Dict[str, str] = None,
+) -> Tuple[List[str], Dict[str, Any]]:
+    """Select the raw columns needed by the schema and the dtype each is parsed into."""
+    column_mapping = column_mapping or {}
+    schema_dtypes = schema.get_metadata().dtypes
+    usecols, dtype = [], {}
+    for raw_col in raw_columns:
+        name = normalize_column_name(raw_col)
+        name = column_mapping.get(name, name)
+        if name not in schema_dtypes:
+            continue
+        usecols.append(raw_col)
+        col_type = schema_dtypes[name]
+        if col_type == int or col_type == float:
+            # int columns are parsed as float and floored to Int64 when cast
+            dtype[raw_col] = "float64"
+        elif col_type == str:
+            dtype[raw_col] = str
+    return usecols, dtype
+
+
+def read_csv(
+    path_to_load: str,
+    separator: str = None,
+    csv_engine: str = "python",
+    schema: BaseSchema = None,
+    column_mapping: Dict[str, str] = None,
+    chunksize: int = None,
+) -> pd.DataFrame | Iterator[pd.DataFrame]:
+    """Read csv/txt file, pushing schema column selection and dtypes into the C or Arrow parser.
+
+    Returns an iterator of DataFrames when `chunksize` is set.
+    """
+    if csv_engine == "python":
+        return pd.read_csv(path_to_load, sep=separator, engine="python", chunksize=chunksize)
+
+    separator = separator or ","  # delimiter sniffing is only supported by the python engine
+    if schema is None:
+        return pd.read_csv(path_to_load, sep=separator, engine=csv_engine, chunksize=chunksize)
+
+    header = pd.read_csv(path_to_load, sep=separator, nrows=0).columns
+    usecols, dtype = get_schema_read_options(raw_columns=header, schema=schema, column_mapping=column_mapping)
+    if chunksize:
+        return pd.read_csv(
+            path_to_load, sep=separator, engine=csv_engine, usecols=usecols, dtype=dtype, chunksize=chunksize
+        )
+    try:
+        return pd.read_csv(path_to_load, sep=separator, engine=csv_engine, usecols=usecols, dtype=dtype)
+    except ValueError as e:
+        logger.warning(f"Could not parse {path_to_load} into schema dtypes, leaving casting to schema: {e}")
+        return pd.read_csv(path_to_load, sep=separator, engine=csv_engine, usecols=usecols)
+
+
 def read_file_as_model(
     base_directory: str,
     time_connector: str,
@@ -128,9 +367,12 @@ def read_file_as_model(
     pipeline_name: str = None,
 ):
     """Load data in sklearn model regressor format."""
-    if pipeline_name:
-        base_directory = os.path.join(base_directory, pipeline_name)
-    path_to_load = os.path.join(base_directory, time_connector, file_name)
+    path_to_load = get_file_path(
+        base_directory=base_directory,
+        time_connector=time_connector,
+        file_name=file_name,
+        pipeline_name=pipeline_name,
+    )
     if file_name.endswith(".pickle"):
         model = read_pickle(path_to_load)
     else:
@@ -145,9 +387,12 @@ def read_file_as_list(
     pipeline_name: str = None,
 ):
     """Load data with python data types from pickle."""
-    if pipeline_name:
-        base_directory = os.path.join(base_directory, pipeline_name)
-    path_to_load = os.path.join(base_directory, time_connector, file_name)
+    path_to_load = get_file_path(
+        base_directory=base_directory,
+        time_connector=time_connector,
+        file_name=file_name,
+        pipeline_name=pipeline_name,
+    )
     if file_name.endswith(".pickle"):
         list_obj = read_pickle(path_to_load)
     else:
@@ -160,14 +405,23 @@ def read_file_as_dict(
     time_connector: str,
     file_name: str,
     pipeline_name: str = None,
+    mmap_mode: str = "r",
 ) -> Dict:
-    """Load data in python dict format."""
-    if pipeline_name:
-        base_directory = os.path.join(base_directory, pipeline_name)
-    path_to_load = os.path.join(base_directory, time_connector, file_name)
+    """Load data in python dict format.
+
+    Array bundles are memory-mapped with `mmap_mode`, None loads them in memory.
+    """
+    path_to_load = get_file_path(
+        base_directory=base_directory,
+        time_connector=time_connector,
+        file_name=file_name,
+        pipeline_name=pipeline_name,
+    )
     if file_name.endswith(".json"):
         with open(path_to_load, "rb") as file:
             dict_in = json.load(file)
+    elif file_name.endswith(ARRAY_BUNDLE_EXT):
+        dict_in = read_array_bundle(path_to_load, mmap_mode=mmap_mode)
     elif file_name.endswith(".pickle"):
         with open(path_to_load, "rb") as file:
             dict_in = pickle.load(file)
@@ -183,9 +437,12 @@ def read_file_as_arviz(
     pipeline_name: str = None,
 ) -> az.InferenceData:
     """Load data in arviz idata format."""
-    if pipeline_name:
-        base_directory = os.path.join(base_directory, pipeline_name)
-    path_to_load = os.path.join(base_directory, time_connector, file_name)
+    path_to_load = get_file_path(
+        base_directory=base_directory,
+        time_connector=time_connector,
+        file_name=file_name,
+        pipeline_name=pipeline_name,
+    )
     if file_name.endswith(".nc"):
         idata = az.from_netcdf(path_to_load)
     elif file_name.endswith(".json"):
@@ -196,57 +453,353 @@ def read_file_as_arviz(
 
 
 def write_file(
-    out_obj: pd.DataFrame | dict | az.InferenceData | Figure,
+    out_obj: pd.DataFrame | Iterator[pd.DataFrame] | dict | az.InferenceData | Figure,
     base_directory: str,
     time_connector: str,
     file_name: str,
     pipeline_name: str = None,
+    partition_on: str = None,
+    parquet_options: Dict = None,
 ):
-    """General write data method for variable formats."""
-    if pipeline_name:
-        base_directory = os.path.join(base_directory, pipeline_name)
-    root_path = os.path.join(base_directory, time_connector)
-    file_path = os.path.join(root_path, file_name)
+    """General write data method for variable formats.
+
+    Parquet files are written with `parquet_options`, see `get_parquet_write_kwargs`.
+
+    An iterator of DataFrames is written chunk by chunk to one parquet file, see
+    `write_parquet_chunks`, synchronously as the chunks are produced while it is consumed.
+    With `partition_on`, DataFrames are written as a parquet dataset partitioned by the year
+    and month of that date column, see `write_partitioned_parquet`.
+    Outputs are written to a temporary path and moved in place, so a failed write never leaves
+    a partial file behind. The move is atomic for files; directories, i.e. array bundles and
+    partitions, are replaced by removing the old one first, and a failed partitioned write keeps
+    the partitions already replaced. With write-behind enabled the write runs in the background,
+    see `utils/write_behind.py`.
+    """
+    file_path = get_file_path(
+        base_directory=base_directory,
+        time_connector=time_connector,
+        file_name=file_name,
+        pipeline_name=pipeline_name,
+    )
+    root_path = os.path.dirname(file_path)
     if not os.path.exists(root_path):
-        os.makedirs(root_path)
-    if file_name.endswith(".json"):
-        if isinstance(out_obj, dict):
-            with open(file_path, "w") as fp:
-                json.dump(out_obj, fp)
-        elif isinstance(out_obj, az.InferenceData):
-            az.to_json(out_obj, file_path)
-        elif isinstance(out_obj, pd.DataFrame):
-            out_obj.to_json(file_path)
-        else:
-            raise ValueError("Object type not supported for chosen format")
-    elif file_name.endswith(".xlsx"):
-        logger.warning(f"{file_name} table shape is {out_obj.shape}")
-        out_obj.to_excel(file_path)
-    elif file_name.endswith(".csv"):
-        logger.warning(f"{file_name} table shape is {out_obj.shape}")
-        out_obj.to_csv(file_path, index=False)
-    elif file_name.endswith(".parquet"):
+        os.makedirs(root_path, exist_ok=True)
+    if isinstance(out_obj, Iterator):
+        write_to_path(out_obj, file_path, partition_on=partition_on, parquet_options=parquet_options)
+    else:
+        WRITE_BEHIND.submit(
+            write_to_path, out_obj, file_path, partition_on=partition_on, parquet_options=parquet_options
+        )
+
+
+def write_to_path(
+    out_obj: pd.DataFrame | Iterator[pd.DataFrame] | dict | az.InferenceData | Figure,
+    file_path: str,
+    partition_on: str = None,
+    parquet_options: Dict = None,
+) -> None:
+    """Write object to file_path in the format given by its extension, see `write_file`."""
+    file_name = os.path.basename(file_path)
+    if file_name.endswith(".parquet") and isinstance(out_obj, Iterator):
+        write_parquet_chunks(
+            chunks=out_obj,
+            file_path=file_path,
+            partition_on=partition_on,
+            parquet_options=parquet_options,
+        )
+        return
+    if file_name.endswith(".parquet") and partition_on:
         logger.warning(f"{file_name} table shape is {out_obj.shape}")
-        out_obj.to_parquet(file_path)
-    elif file_name.endswith(".pickle"):
-        if isinstance(out_obj, dict):
-            save_pickle(out_obj, file_path)
-        elif isinstance(out_obj, pd.DataFrame):
-            out_obj.to_pickle(file_path)
-        else:  # stan model, ml model
-            save_pickle(out_obj, file_path)
-    elif file_name.endswith(".nc"):
-        if isinstance(out_obj, az.InferenceData):
-            az.to_netcdf(out_obj, os.path.join(root_path, file_name))
-        else:
-            raise ValueError("Object type not supported for chosen format")
-    elif file_name.endswith(".png"):
-        if isinstance(out_obj, Figure):
-            out_obj.savefig(os.path.join(root_path, file_name))
+        write_partitioned_parquet(
+            df=out_obj,
+            dir_path=file_path,
+            partition_on=partition_on,
+            parquet_options=parquet_options,
+        )
+        return
+
+    tmp_path = get_temp_path(file_path)
+    try:
+        if file_name.endswith(".json"):
+            if isinstance(out_obj, dict):
+                with open(tmp_path, "w") as fp:
+                    json.dump(out_obj, fp)
+            elif isinstance(out_obj, az.InferenceData):
+                az.to_json(out_obj, tmp_path)
+            elif isinstance(out_obj, pd.DataFrame):
+                out_obj.to_json(tmp_path)
+            else:
+                raise ValueError("Object type not supported for chosen format")
+        elif file_name.endswith(".xlsx"):
+            logger.warning(f"{file_name} table shape is {out_obj.shape}")
+            out_obj.to_excel(tmp_path)
+        elif file_name.endswith(".csv"):
+            logger.warning(f"{file_name} table shape is {out_obj.shape}")
+            out_obj.to_csv(tmp_path, index=False)
+        elif file_name.endswith(".parquet"):
+            logger.warning(f"{file_name} table shape is {out_obj.shape}")
+            out_obj.to_parquet(tmp_path, **get_parquet_write_kwargs(parquet_options))
+        elif file_name.endswith(ARRAY_BUNDLE_EXT):
+            if isinstance(out_obj, dict):
+                save_array_bundle(out_obj, tmp_path)
+            else:
+                raise ValueError("Object type not supported for chosen format")
+        elif file_name.endswith(".pickle"):
+            if isinstance(out_obj, dict):
+                save_pickle(out_obj, tmp_path)
+            elif isinstance(out_obj, pd.DataFrame):
+                out_obj.to_pickle(tmp_path)
+            else:  # stan model, ml model
+                save_pickle(out_obj, tmp_path)
+        elif file_name.endswith(".nc"):
+            if isinstance(out_obj, az.InferenceData):
+                az.to_netcdf(out_obj, tmp_path)
+            else:
+                raise ValueError("Object type not supported for chosen format")
+        elif file_name.endswith(".png"):
+            if isinstance(out_obj, Figure):
+                out_obj.savefig(tmp_path)
+            else:
+                raise ValueError("Object type not supported for chosen format")
         else:
-            raise ValueError("Object type not supported for chosen format")
+            raise ValueError("Write output format not supported")
+        replace_path(tmp_path, file_path)
+    except BaseException:
+        remove_path(tmp_path)
+        raise
+
+
+def get_parquet_options(data_config: Dict, table: str) -> Dict:
+    """Parquet writer settings of a table: the `parquet_options` of its data section, updated by its `tables` entry."""
+    parquet_options = dict(data_config.get("parquet_options") or {})
+    table_options = parquet_options.pop("tables", None) or {}
+    parquet_options.update(table_options.get(table) or {})
+    return parquet_options
+
+
+def get_parquet_write_kwargs(parquet_options: Dict = None, engine: str = None) -> Dict:
+    """Translate parquet_options into keyword arguments of `DataFrame.to_parquet` for the chosen engine.
+
+    Options: engine, compression, compression_level, row_group_size (rows), use_dictionary
+    (pyarrow only, fastparquet only dictionary encodes categoricals) and write_statistics.
+    """
+    parquet_options = parquet_options or {}
+    engine = engine or parquet_options.get("engine", "pyarrow")
+    compression = parquet_options.get("compression", "snappy")
+    compression_level = parquet_options.get("compression_level")
+    row_group_size = parquet_options.get("row_group_size")
+    write_statistics = parquet_options.get("write_statistics", True)
+    if engine == "pyarrow":
+        return {
+            "engine": engine,
+            "compression": compression,
+            "compression_level": compression_level,
+            "row_group_size": row_group_size,
+            "use_dictionary": parquet_options.get("use_dictionary", True),
+            "write_statistics": write_statistics,
+        }
+    elif engine == "fastparquet":
+        if compression and compression_level is not None:
+            compression = {"_default": {"type": compression, "args": {"level": compression_level}}}
+        return {
+            "engine": engine,
+            "compression": compression,
+            "row_group_offsets": row_group_size or 50_000_000,  # fastparquet default
+            "stats": "auto" if write_statistics else False,
+        }
     else:
-        raise ValueError("Write output format not supported")
+        raise ValueError(f"Parquet engine {engine} not supported")
+
+
+def get_temp_path(path: str) -> str:
+    """Hidden temporary path next to path, keeping the extension for writers inferring the format from it."""
+    root_path, file_name = os.path.split(path)
+    return os.path.join(root_path, f".tmp-{uuid.uuid4().hex[:12]}-{file_name}")
+
+
+def replace_path(src: str, dst: str) -> None:
+    """Move a file or directory in place of dst, atomic for files on the same filesystem."""
+    if os.path.isdir(dst):
+        shutil.rmtree(dst)
+    os.replace(src, dst)
+
+
+def remove_path(path: str) -> None:
+    """Remove a file or directory if it exists."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def write_partitioned_parquet(
+    df: pd.DataFrame,
+    dir_path: str,
+    partition_on: str,
+    append: bool = False,
+    parquet_options: Dict = None,
+) -> None:
+    """Write DataFrame as a parquet dataset partitioned by year_month of a date column, in hive layout.
+
+    Partitions present in the DataFrame are replaced, or extended with a new file when
+    appending. Partitions absent from the DataFrame are kept, e.g. when reprocessing a month.
+    A replacement partition is written to a temporary directory and moved in place of the old
+    one, and an appended file to a temporary path, so a failed write never leaves a partial
+    partition behind. The dataset as a whole is not replaced atomically: a failure keeps the
+    partitions already written.
+    """
+    if df[partition_on].isna().any():
+        raise ValueError(f"Partition column {partition_on} contains null values")
+    if os.path.isfile(dir_path):
+        os.remove(dir_path)  # previously written as a single file
+    os.makedirs(dir_path, exist_ok=True)
+    year_month = df[partition_on].dt.year * 100 + df[partition_on].dt.month
+    for value, part_df in df.groupby(year_month.astype(int)):
+        part_path = os.path.join(dir_path, f"{n.F_YEAR_MONTH}={value}")
+        is_replaced = not (append and os.path.isdir(part_path))
+        write_path = get_temp_path(part_path) if is_replaced else part_path
+        os.makedirs(write_path, exist_ok=True)
+        part_file_path = os.path.join(write_path, f"part-{len(os.listdir(write_path)):05d}.parquet")
+        tmp_path = get_temp_path(part_file_path)
+        try:
+            part_df.to_parquet(tmp_path, index=False, **get_parquet_write_kwargs(parquet_options))
+            os.replace(tmp_path, part_file_path)
+            if is_replaced:
+                replace_path(write_path, part_path)
+        except BaseException:
+            remove_path(tmp_path)
+            if is_replaced:
+                remove_path(write_path)
+            raise
+
+
+def write_parquet_chunks(
+    chunks: Iterator[pd.DataFrame],
+    file_path: str,
+    partition_on: str = None,
+    parquet_options: Dict = None,
+) -> None:
+    """Write DataFrame chunks as the row groups of one parquet file, with bounded memory.
+
+    Chunks are cast to the arrow schema of the first chunk, so the file holds the same dtypes as a
+    single write of all rows, e.g. nullable integers. The file is written with pyarrow to a
+    temporary path and moved in place after the last chunk. With `partition_on`, the dataset is
+    removed and each chunk is appended to its partitions, see `write_partitioned_parquet`.
+    """
+    if partition_on:
+        remove_path(file_path)
+        for df in chunks:
+            write_partitioned_parquet(
+                df=df,
+                dir_path=file_path,
+                partition_on=partition_on,
+                append=True,
+                parquet_options=parquet_options,
+            )
+        return
+
+    parquet_kwargs = get_parquet_write_kwargs(parquet_options, engine="pyarrow")
+    parquet_kwargs.pop("engine")
+    row_group_size = parquet_kwargs.pop("row_group_size")
+    tmp_path = get_temp_path(file_path)
+    writer, n_rows = None, 0
+    try:
+        for df in chunks:
+            table = pa.Table.from_pandas(df, schema=writer.schema if writer else None, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, **parquet_kwargs)
+            writer.write_table(table, row_group_size=row_group_size)
+            n_rows += len(df)
+        if writer is None:
+            logger.warning(f"No chunks to write to {os.path.basename(file_path)}.")
+            return
+        writer.close()
+        logger.warning(f"{os.path.basename(file_path)} table has {n_rows} rows")
+        replace_path(tmp_path, file_path)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        remove_path(tmp_path)
+        raise
+
+
+def remove_file(
+    base_directory: str,
+    time_connector: str,
+    file_name: str,
+    pipeline_name: str = None,
+) -> None:
+    """Remove a file or dataset directory if it exists."""
+    file_path = get_file_path(
+        base_directory=base_directory,
+        time_connector=time_connector,
+        file_name=file_name,
+        pipeline_name=pipeline_name,
+    )
+    remove_path(file_path)
+
+
+def save_array_bundle(output: Dict, output_dirpath: str) -> None:
+    """Save dict of DataFrames, Series, arrays and sparse matrices as a directory of .npy files.
+
+    Values are stored as contiguous numeric arrays with their index, sparse matrices as their CSR
+    arrays, so they can be memory-mapped back without unpickling. Other values must be json serialisable.
+    """
+    if os.path.isdir(output_dirpath):
+        shutil.rmtree(output_dirpath)
+    os.makedirs(output_dirpath)
+    metadata = {}
+    for key, value in output.items():
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            numpy_dtypes = [getattr(dtype, "numpy_dtype", dtype) for dtype in np.atleast_1d(value.dtypes)]
+            values = value.to_numpy(dtype=np.result_type(np.float32, *numpy_dtypes), na_value=np.nan)
+            np.save(os.path.join(output_dirpath, f"{key}.npy"), np.ascontiguousarray(values))
+            np.save(os.path.join(output_dirpath, f"{key}.index.npy"), value.index.to_numpy())
+            if isinstance(value, pd.DataFrame):
+                metadata[key] = {"kind": "frame", "columns": [str(col) for col in value.columns]}
+            else:
+                metadata[key] = {"kind": "series", "name": value.name}
+        elif isinstance(value, np.ndarray):
+            np.save(os.path.join(output_dirpath, f"{key}.npy"), np.ascontiguousarray(value))
+            metadata[key] = {"kind": "array"}
+        elif sparse.issparse(value):
+            value = value.tocsr()
+            for part in ("data", "indices", "indptr"):
+                np.save(os.path.join(output_dirpath, f"{key}.{part}.npy"), getattr(value, part))
+            metadata[key] = {"kind": "csr", "shape": list(value.shape)}
+        else:
+            metadata[key] = {"kind": "value", "value": value}
+    with open(os.path.join(output_dirpath, ARRAY_BUNDLE_METADATA), "w") as fp:
+        json.dump(metadata, fp)
+
+
+def read_array_bundle(input_dirpath: str, mmap_mode: str = "r") -> Dict:
+    """Read dict saved by `save_array_bundle`, pandas objects are zero-copy views of the arrays."""
+    with open(os.path.join(input_dirpath, ARRAY_BUNDLE_METADATA), "r") as fp:
+        metadata = json.load(fp)
+    input_dict = {}
+    for key, meta in metadata.items():
+        if meta["kind"] == "value":
+            input_dict[key] = meta["value"]
+            continue
+        if meta["kind"] == "csr":
+            parts = [
+                np.load(os.path.join(input_dirpath, f"{key}.{part}.npy"), mmap_mode=mmap_mode)
+                for part in ("data", "indices", "indptr")
+            ]
+            input_dict[key] = sparse.csr_matrix(tuple(parts), shape=tuple(meta["shape"]))
+            continue
+        values = np.load(os.path.join(input_dirpath, f"{key}.npy"), mmap_mode=mmap_mode)
+        if meta["kind"] == "array":
+            input_dict[key] = values
+            continue
+        index = np.load(os.path.join(input_dirpath, f"{key}.index.npy"), allow_pickle=False)
+        if meta["kind"] == "frame":
+            input_dict[key] = pd.DataFrame(values, index=index, columns=meta["columns"], copy=False)
+        else:
+            input_dict[key] = pd.Series(values, index=index, name=meta["name"], copy=False)
+    return input_dict
+
 
 def save_pickle(output: Any, output_filepath: str) -> None:
     """Save output as pickle to local."""
@@ -0,0 +1,67 @@
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+# blocks attached by worker processes, kept open for the life of the worker
+_ATTACHED: Dict[str, SharedMemory] = {}
+
+
+class SharedArraySpec(NamedTuple):
+    """Picklable reference to a numpy array held in a named shared memory block."""
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class SharedArrays:
+    """Numpy arrays in shared memory blocks, created and unlinked by the owning process.
+
+    Worker processes get the picklable `SharedArraySpec` of each array and read or write the
+    block in place through `get_shared_array`, so arrays are never pickled between processes.
+    """
+
+    def __init__(self):
+        self.blocks: List[SharedMemory] = []
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def allocate(self, shape: Tuple[int, ...], dtype: str = "float64") -> SharedArraySpec:
+        """Create an uninitialised shared array."""
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        block = SharedMemory(create=True, size=size)
+        self.blocks.append(block)
+        return SharedArraySpec(name=block.name, shape=tuple(shape), dtype=np.dtype(dtype).str)
+
+    def put(self, values: np.ndarray) -> SharedArraySpec:
+        """Copy an array into shared memory."""
+        spec = self.allocate(shape=values.shape, dtype=values.dtype)
+        self._view(spec)[...] = values
+        return spec
+
+    def read(self, spec: SharedArraySpec) -> np.ndarray:
+        """Copy of a shared array, valid after the blocks are closed."""
+        return self._view(spec).copy()
+
+    def close(self) -> None:
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def _view(self, spec: SharedArraySpec) -> np.ndarray:
+        block = next(block for block in self.blocks if block.name == spec.name)
+        return np.ndarray(spec.shape, dtype=spec.dtype, buffer=block.buf)
+
+
+def get_shared_array(spec: SharedArraySpec) -> np.ndarray:
+    """View of a shared array in a worker process, attaching its block on first use."""
+    if spec.name not in _ATTACHED:
+        # pool workers share the resource tracker of the owning process, which unlinks the block
+        _ATTACHED[spec.name] = SharedMemory(name=spec.name)
+    return np.ndarray(spec.shape, dtype=spec.dtype, buffer=_ATTACHED[spec.name].buf)
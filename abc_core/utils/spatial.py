@@ -0,0 +1,92 @@
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from abc_core.utils.feature_fcns import EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+
+class SpatialIndex:
+    """Haversine BallTree over lat-long points, built once and queried for neighbourhood features.
+
+    Queries of the indexed points themselves, in index order, pass `exclude_self` so a point is not
+    its own neighbour, e.g. for leakage-safe neighbour target means on the training split.
+    """
+
+    def __init__(self, lat: np.ndarray, lng: np.ndarray, values: np.ndarray = None, leaf_size: int = 40):
+        self.tree = BallTree(to_radians(lat, lng), leaf_size=leaf_size, metric="haversine")
+        self.values = None if values is None else np.asarray(values, dtype=float)
+
+    def __len__(self) -> int:
+        return self.tree.data.shape[0]
+
+    def query(
+        self,
+        lat: np.ndarray,
+        lng: np.ndarray,
+        k: int,
+        exclude_self: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Distances in km and positions of the k nearest indexed points, shape (len(lat), k)."""
+        k_query = min(k + exclude_self, len(self))
+        distances, positions = self.tree.query(to_radians(lat, lng), k=k_query)
+        if exclude_self:
+            # drop the point itself, or the farthest neighbour when a duplicate location came first
+            is_dropped = positions == np.arange(len(positions))[:, None]
+            is_dropped[~is_dropped.any(axis=1), -1] = True
+            distances = distances[~is_dropped].reshape(len(positions), k_query - 1)
+            positions = positions[~is_dropped].reshape(len(positions), k_query - 1)
+        return distances * EARTH_RADIUS_KM, positions
+
+    def count_within(
+        self,
+        lat: np.ndarray,
+        lng: np.ndarray,
+        radius_km: float,
+        exclude_self: bool = False,
+    ) -> np.ndarray:
+        """Number of indexed points within radius_km of each point."""
+        counts = self.tree.query_radius(to_radians(lat, lng), r=radius_km / EARTH_RADIUS_KM, count_only=True)
+        return counts - 1 if exclude_self else counts
+
+    def neighbour_mean(self, lat: np.ndarray, lng: np.ndarray, k: int, exclude_self: bool = False) -> np.ndarray:
+        """Mean of the indexed values over the k nearest indexed points."""
+        _, positions = self.query(lat, lng, k=k, exclude_self=exclude_self)
+        return np.nanmean(self.values[positions], axis=1)
+
+
+def to_radians(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Stack lat-long degrees into the (n, 2) radians array expected by the haversine metric."""
+    return np.radians(np.column_stack([np.asarray(lat, dtype=float), np.asarray(lng, dtype=float)]))
+
+
+def get_spatial_feature_names(spatial_config: Dict) -> List[str]:
+    """Names of the neighbourhood features configured under `forecast_model.spatial_features`."""
+    names = [f"knn_{k}_mean_distance_km" for k in spatial_config.get("k_neighbours", [])]
+    names += [f"count_within_{radius:g}_km" for radius in spatial_config.get("radius_km", [])]
+    if spatial_config.get("neighbour_target_k"):
+        names.append(f"knn_{spatial_config.neighbour_target_k}_mean_target")
+    return names
+
+
+def compute_spatial_features(
+    index: SpatialIndex,
+    lat: np.ndarray,
+    lng: np.ndarray,
+    spatial_config: Dict,
+    exclude_self: bool = False,
+) -> Dict[str, np.ndarray]:
+    """Neighbourhood features of points against the index, in `get_spatial_feature_names` order."""
+    features = {}
+    for k in spatial_config.get("k_neighbours", []):
+        distances, _ = index.query(lat, lng, k=k, exclude_self=exclude_self)
+        features[f"knn_{k}_mean_distance_km"] = distances.mean(axis=1)
+    for radius in spatial_config.get("radius_km", []):
+        features[f"count_within_{radius:g}_km"] = index.count_within(lat, lng, radius, exclude_self=exclude_self)
+    if spatial_config.get("neighbour_target_k"):
+        k = spatial_config.neighbour_target_k
+        features[f"knn_{k}_mean_target"] = index.neighbour_mean(lat, lng, k=k, exclude_self=exclude_self)
+    return features
@@ -0,0 +1,160 @@
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+from abc_core.constant import name as n
+
+logger = logging.getLogger(__name__)
+
+# statistics from cumulative sums over the window bounds, or from pandas rolling over the same bounds
+CUMULATIVE_STATS = ("mean", "sum", "count")
+WINDOW_STATS = ("median", "min", "max")
+
+
+class WindowBounds(BaseIndexer):
+    """Precomputed window bounds, so pandas rolling aggregations run over all groups in one call."""
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        return self.start, self.end
+
+
+class TimeWindows:
+    """Positions of time windows over dates, optionally within groups, from a single sort of the rows.
+
+    Rows are sorted by group and date into one int64 key, so the bounds of every window of every
+    group are found with `np.searchsorted`. Windows only hold rows of earlier dates of the same
+    group: neither the row itself nor rows of the same date enter its features, e.g. its target.
+    Dates must not be missing.
+    """
+
+    def __init__(self, dates: np.ndarray, groups: np.ndarray = None):
+        days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+        groups = np.zeros(len(days), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+        first_day = days.min() if len(days) else 0
+        self.span = int(days.max() - first_day) + 1 if len(days) else 1
+        # a window is at most span days long, so a stride of twice the span keeps groups apart
+        self.stride = 2 * self.span
+        group_keys = groups * self.stride
+        key = group_keys + days - first_day
+        self.order = np.argsort(key, kind="stable")
+        self.key = key[self.order]
+        self.start = np.searchsorted(self.key, group_keys[self.order], side="left")
+        self.end = np.searchsorted(self.key, self.key, side="left")
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def rolling_bounds(self, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted positions [start, end) of the rows within `days` days before each row."""
+        return np.searchsorted(self.key, self.key - min(days, self.span), side="left"), self.end
+
+    def expanding_bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted positions [start, end) of all rows before each row."""
+        return self.start, self.end
+
+    def sort(self, values: np.ndarray) -> np.ndarray:
+        return np.asarray(values, dtype=float)[self.order]
+
+    def unsort(self, values: np.ndarray) -> np.ndarray:
+        out = np.empty(len(values), dtype=float)
+        out[self.order] = values
+        return out
+
+    def lag(self, values: np.ndarray, k: int) -> np.ndarray:
+        """Sorted values of the k-th last row before each row, NaN when there are fewer than k."""
+        positions = self.end - k
+        is_valid = positions >= self.start
+        return np.where(is_valid, values[np.where(is_valid, positions, 0)], np.nan)
+
+    def aggregate(self, values: np.ndarray, bounds: Tuple[np.ndarray, np.ndarray], stat: str) -> np.ndarray:
+        """Statistic of the sorted values over the window bounds, ignoring NaN, NaN for empty windows."""
+        start, end = bounds
+        if stat in CUMULATIVE_STATS:
+            is_valid = ~np.isnan(values)
+            counts = np.concatenate([[0], np.cumsum(is_valid)])
+            counts = counts[end] - counts[start]
+            if stat == "count":
+                return counts.astype(float)
+            sums = np.concatenate([[0.0], np.cumsum(np.where(is_valid, values, 0.0))])
+            sums = sums[end] - sums[start]
+            if stat == "sum":
+                return sums
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        if stat in WINDOW_STATS:
+            indexer = WindowBounds(start=start.astype(np.int64), end=end.astype(np.int64))
+            rolling = pd.Series(values).rolling(indexer, min_periods=1)
+            return getattr(rolling, stat)().to_numpy()
+        raise ValueError(f"Unsupported window statistic: {stat}")
+
+
+def get_grid_cells(lat: np.ndarray, lng: np.ndarray, cell_degrees: float) -> np.ndarray:
+    """Integer code of the lat-long grid cell of each point."""
+    rows = np.floor(np.asarray(lat, dtype=float) / cell_degrees).astype(np.int64)
+    cols = np.floor(np.asarray(lng, dtype=float) / cell_degrees).astype(np.int64)
+    codes, _ = pd.factorize((rows - rows.min()) * (cols.max() - cols.min() + 1) + cols - cols.min())
+    return codes
+
+
+def get_group_codes(df: pd.DataFrame, temporal_config: Dict) -> np.ndarray:
+    """Group of each row from the `group_by` columns and lat-long grid cell, None for a single series."""
+    keys = [df[col].to_numpy() for col in temporal_config.get("group_by") or []]
+    if temporal_config.get("grid_cell_degrees"):
+        lat = df[n.F_X5_LATITUDE].to_numpy(dtype=float, na_value=np.nan)
+        lng = df[n.F_X6_LONGITUDE].to_numpy(dtype=float, na_value=np.nan)
+        keys.append(get_grid_cells(lat=lat, lng=lng, cell_degrees=temporal_config.grid_cell_degrees))
+    if not keys:
+        return None
+    return pd.Series(np.zeros(len(df))).groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+
+
+def get_date_cutoff(date_counts: pd.Series, test_split: float) -> pd.Timestamp:
+    """Last date of the training split of a time-ordered split, from the number of rows of each date.
+
+    The test split holds the rows of the dates after the cutoff, about `test_split` of all rows.
+    Rows of one date are never split, so the windows of training rows only hold training rows.
+    """
+    counts = date_counts.sort_index()
+    n_train = (1 - test_split) * counts.sum()
+    position = np.searchsorted(counts.cumsum().to_numpy(), n_train, side="left")
+    return counts.index[min(position, len(counts) - 1)]
+
+
+def get_temporal_feature_names(temporal_config: Dict) -> List[str]:
+    """Names of the features configured under `forecast_model.temporal_features`."""
+    names = []
+    for col in temporal_config.get("columns", []):
+        names += [f"{col}__lag_{k}" for k in temporal_config.get("lags", [])]
+        names += [
+            f"{col}__rolling_{days}d_{stat}"
+            for days in temporal_config.get("rolling_days", [])
+            for stat in temporal_config.get("rolling_stats", [])
+        ]
+        names += [f"{col}__expanding_{stat}" for stat in temporal_config.get("expanding_stats", [])]
+    return names
+
+
+def compute_temporal_features(
+    df: pd.DataFrame,
+    temporal_config: Dict,
+    date_column: str = n.F_X1_TRANSACTION_DATE,
+) -> Dict[str, np.ndarray]:
+    """Lag, rolling and expanding features of the configured columns, in `get_temporal_feature_names` order."""
+    windows = TimeWindows(dates=df[date_column].to_numpy(), groups=get_group_codes(df, temporal_config))
+    bounds = {days: windows.rolling_bounds(days) for days in temporal_config.get("rolling_days", [])}
+    features = {}
+    for col in temporal_config.get("columns", []):
+        values = windows.sort(df[col].to_numpy(dtype=float, na_value=np.nan))
+        for k in temporal_config.get("lags", []):
+            features[f"{col}__lag_{k}"] = windows.unsort(windows.lag(values, k=k))
+        for days, window_bounds in bounds.items():
+            for stat in temporal_config.get("rolling_stats", []):
+                aggregated = windows.aggregate(values, bounds=window_bounds, stat=stat)
+                features[f"{col}__rolling_{days}d_{stat}"] = windows.unsort(aggregated)
+        for stat in temporal_config.get("expanding_stats", []):
+            aggregated = windows.aggregate(values, bounds=windows.expanding_bounds(), stat=stat)
+            features[f"{col}__expanding_{stat}"] = windows.unsort(aggregated)
+    return features
@@ -1,14 +1,27 @@
 import pandas as pd
-from typing import List
+from typing import Dict, List
 from itertools import product
 
 from abc_core.schema.base_schema import BaseSchema
 
-def apply_schema(df: pd.DataFrame, schema: BaseSchema) -> pd.DataFrame:
-    """Apply schema to processed data."""
+def apply_schema(
+    df: pd.DataFrame,
+    schema: BaseSchema,
+    compact: bool = False,
+    observed: bool = True,
+    validation: Dict = None,
+) -> pd.DataFrame:
+    """Apply schema to processed data, optionally validated and with compact numpy and category dtypes.
+
+    `validation` holds the keyword arguments of `schema.validate`, checks run before compacting.
+    """
     df = schema.handle_missing_columns(df)
     df = df[schema.get_column_names()]
     df = schema.cast(df)
+    if validation is not None:
+        schema.validate(df, **validation)
+    if compact:
+        df = schema.compact(df, observed=observed)
     return df
 
 
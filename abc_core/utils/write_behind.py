@@ -0,0 +1,64 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Queue of file writes run on a background thread pool, so tasks continue while outputs are written.
+
+    Queued objects must not be mutated afterwards. Writes queued from another process than the
+    one which enabled the queue, e.g. tasks run on a process pool, are run synchronously.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.pid = None
+        self.futures: List[Future] = []
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.executor is not None and self.pid == os.getpid()
+
+    def enable(self, max_workers: int = 4) -> None:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="write_behind")
+            self.pid = os.getpid()
+
+    def submit(self, fcn: Callable, *args, **kwargs) -> None:
+        """Queue a write, or run it at once when the queue is not enabled."""
+        if not self.enabled:
+            fcn(*args, **kwargs)
+            return
+        with self.lock:
+            self.futures.append(self.executor.submit(fcn, *args, **kwargs))
+
+    def flush(self) -> None:
+        """Wait for every queued write, raising the first error once all have completed."""
+        with self.lock:
+            futures, self.futures = self.futures, []
+        if not futures:
+            return
+        wait(futures)
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        for error in errors[1:]:
+            logger.error(f"Background write failed: {error!r}")
+        if errors:
+            raise errors[0]
+
+
+WRITE_BEHIND = WriteBehindQueue()
+
+
+def enable_write_behind(max_workers: int = 4) -> None:
+    """Run subsequent `write_file` calls in the background, see `WriteBehindQueue`."""
+    WRITE_BEHIND.enable(max_workers=max_workers)
+
+
+def flush_pending_writes() -> None:
+    """Block until all background writes are on disk, raising any write error."""
+    WRITE_BEHIND.flush()